@@ -0,0 +1,162 @@
+# Analítica columnar con pandas. main la importa solo al atender /analytics, para que el resto de las
+# solicitudes no cargue numpy ni pandas
+import numpy as np
+import pandas as pd
+import pytz
+
+from keyword_matcher import NO_CONCEPT
+from sentiment_trend import SENTIMENTS, bucket_start, engagement_weight, trend_series
+from tweet_store import CONCEPT_SEPARATOR
+
+METRIC_COLUMNS = ["like_count", "retweet_count", "reply_count", "quote_count"]
+
+
+class SentimentFrame:
+    # Tweets en forma columnar (una fila por tweet) y sus asignaciones a conceptos (una fila por par
+    # tweet-concepto). Todos los agregados se calculan con groupby vectorizados sobre estas dos tablas.
+    # assigned trae las columnas id y concept; un tweet sin conceptos del PND cuenta como "Ninguno"
+    def __init__(self, tweets, assigned, concepts, timezone="America/Bogota"):
+        self.concept_names = list(concepts) + [NO_CONCEPT]
+        self.timezone = timezone
+        tweets = tweets.drop_duplicates("id").reset_index(drop=True)
+        tweets["sentiment"] = pd.Categorical(tweets["sentiment"].fillna("neutral"), categories=SENTIMENTS)
+        created_at = tweets["created_at"]
+        if pd.api.types.is_numeric_dtype(created_at):
+            # Segundos Unix (TweetStore.load_columns): evita interpretar textos ISO fila por fila
+            created_at = pd.to_datetime(created_at, unit="s", utc=True)
+        else:
+            created_at = pd.to_datetime(created_at, utc=True, errors="coerce")
+        tweets["created_at"] = created_at.dt.tz_convert(timezone)
+        for column in METRIC_COLUMNS:
+            tweets[column] = pd.to_numeric(tweets[column], errors="coerce").fillna(0).astype(np.int64)
+        tweets["engagement"] = tweets[METRIC_COLUMNS].sum(axis=1)
+        tweets["weight"] = engagement_weight(tweets["engagement"].to_numpy(dtype=np.float64), np.log1p)
+        self.tweets = tweets
+
+        rows = pd.Index(tweets["id"]).get_indexer(assigned["id"])
+        known = rows >= 0
+        codes = pd.Categorical(assigned["concept"].to_numpy()[known], categories=self.concept_names).codes
+        rows = rows[known]
+        # Los conceptos fuera de la lista (código -1) y los tweets sin ninguna asignación van a "Ninguno"
+        codes = np.where(codes < 0, len(concepts), codes)
+        unassigned = np.setdiff1d(np.arange(len(tweets)), rows)
+        rows = np.concatenate([rows, unassigned])
+        codes = np.concatenate([codes, np.full(len(unassigned), len(concepts))])
+        pairs = pd.DataFrame({"row": rows, "code": codes}).drop_duplicates()
+        rows = pairs["row"].to_numpy()
+        assignments = tweets.iloc[rows][["sentiment", "created_at", "weight"]].reset_index(drop=True)
+        assignments["row"] = rows
+        assignments["concept"] = pd.Categorical.from_codes(pairs["code"].to_numpy(), categories=self.concept_names)
+        self.assignments = assignments
+
+    @classmethod
+    def from_records(cls, records, concepts, concepts_per_record=None, timezone="America/Bogota"):
+        # records: diccionarios con id, sentiment, created_at y public_metrics (como los de main.records_to_tweet_texts);
+        # los conceptos de cada uno son una lista o un texto separado por "|"
+        tweets = pd.DataFrame({
+            "id": [record.get("id") for record in records],
+            "created_at": [record.get("created_at") for record in records],
+            "sentiment": [record.get("sentiment") for record in records],
+            **{column: [(record.get("public_metrics") or {}).get(column, 0) for record in records] for column in METRIC_COLUMNS},
+        })
+        # Sin ID (p. ej. tweets de prueba) cada fila es un tweet distinto
+        row_ids = pd.Series([f"row:{i}" for i in range(len(tweets))], index=tweets.index, dtype=object)
+        tweets["id"] = tweets["id"].astype(object).where(tweets["id"].notna(), row_ids)
+        if concepts_per_record is None:
+            concepts_per_record = [record.get("concepts") for record in records]
+        assigned = pd.DataFrame(
+            [
+                (tweet_id, concept)
+                for tweet_id, record_concepts in zip(tweets["id"], concepts_per_record)
+                for concept in (record_concepts.split(CONCEPT_SEPARATOR) if isinstance(record_concepts, str) else record_concepts or [])
+            ],
+            columns=["id", "concept"],
+        )
+        return cls(tweets, assigned, concepts, timezone)
+
+    @classmethod
+    def from_rows(cls, rows, columns, concept_rows, concepts, timezone="America/Bogota"):
+        # rows y concept_rows: las dos listas de tuplas que devuelve TweetStore.load_columns. Se copian de una
+        # vez a una matriz de objetos y se convierte cada columna, en lugar de inferir tipos fila por fila
+        # (DataFrame.from_records), que con cientos de miles de tuplas es lo más lento de la carga
+        table = np.array(rows, dtype=object).reshape(len(rows), len(columns))
+        tweets = pd.DataFrame({column: table[:, i] for i, column in enumerate(columns)})
+        # created_at en segundos Unix; NULL (None) queda como NaN
+        for column in ("id", "created_at"):
+            tweets[column] = pd.to_numeric(tweets[column], errors="coerce")
+        table = np.array(concept_rows, dtype=object).reshape(len(concept_rows), 2)
+        assigned = pd.DataFrame({"id": pd.to_numeric(table[:, 0]), "concept": table[:, 1]})
+        return cls(tweets, assigned, concepts, timezone)
+
+    def __len__(self):
+        return len(self.tweets)
+
+    def _grid(self, series):
+        # Completa la tabla concepto x sentimiento con ceros, en el orden de los conceptos
+        return series.unstack(fill_value=0).reindex(index=self.concept_names, columns=SENTIMENTS, fill_value=0)
+
+    def counts(self):
+        return self._grid(self.assignments.groupby(["concept", "sentiment"], observed=False).size())
+
+    def totals(self):
+        # Tweets únicos con al menos un concepto del PND, por sentimiento
+        matched = self.assignments.loc[self.assignments["concept"] != NO_CONCEPT, "row"].unique()
+        return self.tweets["sentiment"].iloc[matched].value_counts().reindex(SENTIMENTS, fill_value=0)
+
+    def engagement_weighted(self):
+        # Proporción de cada sentimiento ponderada por interacción, y balance neto (positivo - negativo)
+        weights = self._grid(self.assignments.groupby(["concept", "sentiment"], observed=False)["weight"].sum())
+        shares = weights.div(weights.sum(axis=1).replace(0, np.nan), axis=0).fillna(0.0)
+        shares["net"] = shares["positivo"] - shares["negativo"]
+        return shares
+
+    def trend_buckets(self, freq="D", concept=None):
+        # Totales por periodo de sentiment_trend.bucket_start, como diccionarios {periodo: {sentimiento: total}}
+        # (conteos y pesos). Los periodos se calculan como enteros y se cuentan con bincount, sin ordenar por fecha
+        data = self.assignments[self.assignments["concept"] == concept] if concept else self.tweets
+        data = data[data["created_at"].notna()]
+        if data.empty:
+            return {}, {}
+        created_at = pd.DatetimeIndex(data["created_at"])
+        timestamps = created_at.asi8 // 10**9
+        buckets = bucket_start(timestamps, created_at.tz_localize(None).asi8 // 10**9 - timestamps, freq.upper().startswith("H"))
+        periods, positions = np.unique(buckets, return_inverse=True)
+        codes = positions.reshape(-1) * len(SENTIMENTS) + data["sentiment"].cat.codes.to_numpy()
+        shape = (len(periods), len(SENTIMENTS))
+        counts = np.bincount(codes, minlength=shape[0] * shape[1]).reshape(shape)
+        weights = np.bincount(codes, weights=data["weight"].to_numpy(), minlength=shape[0] * shape[1]).reshape(shape)
+        return (
+            {int(period): dict(zip(SENTIMENTS, row.tolist())) for period, row in zip(periods, counts)},
+            {int(period): dict(zip(SENTIMENTS, row.tolist())) for period, row in zip(periods, weights)},
+        )
+
+    def chart_data(self):
+        # Mismo formato que main.get_chart_data
+        counts = self.counts().drop(index=NO_CONCEPT)
+        counts = counts[counts.sum(axis=1) > 0]
+        return {
+            "labels": counts.index.tolist(),
+            "datasets": [
+                {"label": "Positivo", "data": counts["positivo"].tolist(), "backgroundColor": "#36A2EB"},
+                {"label": "Negativo", "data": counts["negativo"].tolist(), "backgroundColor": "#FF6384"},
+                {"label": "Neutral", "data": counts["neutral"].tolist(), "backgroundColor": "#FFCE56"}
+            ]
+        }
+
+    def trend_data(self, freq="D", concept=None):
+        # Mismo formato que main.get_trend_data
+        return trend_series(*self.trend_buckets(freq, concept), freq, pytz.timezone(self.timezone))
+
+    def summary(self, freq="D"):
+        counts = self.counts()
+        weighted = self.engagement_weighted()
+        return {
+            "tweets": len(self.tweets),
+            "totals": {sentiment: int(count) for sentiment, count in self.totals().items()},
+            "counts": {concept: {sentiment: int(row[sentiment]) for sentiment in SENTIMENTS} for concept, row in counts.iterrows()},
+            "engagement_weighted": {
+                concept: {column: round(float(row[column]), 4) for column in SENTIMENTS + ["net"]}
+                for concept, row in weighted.iterrows()
+            },
+            "trend": self.trend_data(freq),
+        }
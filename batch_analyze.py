@@ -0,0 +1,60 @@
+# Reportes para varias ubicaciones en una sola corrida, con la misma cuota de Twitter y lotes de
+# sentimiento compartidos. Uso:
+#   python -m batch_analyze Bogotá Medellín Cali --politician petrogustavo --output reportes.json
+#   python -m batch_analyze --file municipios.txt
+import argparse
+import json
+import sys
+
+import main
+
+COLUMNS = [
+    ("location", "Ubicación"),
+    ("politician", "Político"),
+    ("tweets", "Tweets"),
+    ("positivo", "% Pos"),
+    ("negativo", "% Neg"),
+    ("neutral", "% Neu"),
+    ("top_concept", "Concepto principal"),
+    ("most_negative_concept", "Más negativo"),
+]
+
+
+def format_table(rows):
+    cells = [[label for _, label in COLUMNS]] + [["" if row[key] is None else str(row[key]) for key, _ in COLUMNS] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(COLUMNS))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)) for line in cells)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Análisis por lotes de varias ubicaciones")
+    parser.add_argument("locations", nargs="*", help="Ubicaciones a analizar")
+    parser.add_argument("--file", help="Archivo con una ubicación por línea")
+    parser.add_argument("--politician", default=None)
+    parser.add_argument("--candidate-name", default="[Nombre del Candidato]")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--output", help="Escribe los reportes completos en este archivo JSON")
+    args = parser.parse_args()
+
+    locations = list(args.locations)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            locations.extend(line.strip() for line in f if line.strip())
+    targets = main.batch_targets({"locations": locations, "politician": args.politician, "candidate_name": args.candidate_name})
+    if not targets:
+        parser.error("se requiere al menos una ubicación")
+
+    try:
+        result = main.analyze_batch(targets, args.max_workers)
+    except main.RateLimitExceeded as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+    print(format_table(result["comparison"]))
+
+
+if __name__ == "__main__":
+    main_cli()
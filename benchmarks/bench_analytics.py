@@ -0,0 +1,66 @@
+# Compara los conteos con diccionarios anidados (como classify_tweets + get_chart_data) contra los agregados
+# vectorizados de analytics.SentimentFrame, sobre un volumen de tablero.
+# Uso: python -m benchmarks.bench_analytics --tweets 300000
+import argparse
+import random
+import time
+
+import analytics
+import main
+
+
+def synthetic_rows(size, seed=0):
+    # Mismo formato que TweetStore.load_columns: (tweets, pares tweet-concepto)
+    rng = random.Random(seed)
+    now = int(time.time())
+    rows, concept_rows = [], []
+    for tweet_id in range(size):
+        rows.append((
+            tweet_id,
+            now - rng.randint(0, 30 * 24 * 3600),
+            rng.randint(0, 500), rng.randint(0, 100), rng.randint(0, 50), rng.randint(0, 20),
+            rng.choice(analytics.SENTIMENTS),
+        ))
+        concepts = rng.sample(main.PND_CONCEPTS, rng.choice([0, 1, 1, 1, 2])) or [analytics.NO_CONCEPT]
+        concept_rows.extend((tweet_id, concept) for concept in concepts)
+    return rows, concept_rows
+
+
+def dict_aggregates(rows, concept_rows):
+    counts = {concept: {sentiment: 0 for sentiment in analytics.SENTIMENTS} for concept in main.PND_CONCEPTS + [analytics.NO_CONCEPT]}
+    sentiments = {row[0]: row[6] for row in rows}
+    for tweet_id, concept in concept_rows:
+        counts[concept][sentiments[tweet_id]] += 1
+    return counts
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de agregados vectorizados de sentimiento")
+    parser.add_argument("--tweets", type=int, default=300_000)
+    args = parser.parse_args()
+
+    rows, concept_rows = synthetic_rows(args.tweets)
+
+    legacy, legacy_time = timed(lambda: dict_aggregates(rows, concept_rows))
+    frame, build_time = timed(lambda: analytics.SentimentFrame.from_rows(rows, main.ANALYTICS_COLUMNS, concept_rows, main.PND_CONCEPTS))
+    counts, counts_time = timed(frame.counts)
+    _, aggregate_time = timed(lambda: (frame.totals(), frame.engagement_weighted(), frame.trend_data("D"), frame.trend_data("H")))
+
+    assert all(counts.loc[concept, sentiment] == legacy[concept][sentiment] for concept in legacy for sentiment in analytics.SENTIMENTS)
+    print(f"{args.tweets} tweets, {len(concept_rows)} pares tweet-concepto")
+    print(f"Diccionarios (solo conteos):                    {legacy_time * 1000:8.1f} ms")
+    print(f"SentimentFrame, construcción:                   {build_time * 1000:8.1f} ms")
+    print(f"SentimentFrame, conteos:                        {counts_time * 1000:8.1f} ms  ({legacy_time / counts_time:.1f}x)")
+    print(f"SentimentFrame, totales + ponderados + tendencias: {aggregate_time * 1000:8.1f} ms")
+    print(f"Conteos con construcción incluida:              {(build_time + counts_time) * 1000:8.1f} ms  "
+          f"({legacy_time / (build_time + counts_time):.1f}x)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,66 @@
+# Compara N llamadas secuenciales a job() contra un solo analyze_batch() para N ubicaciones, con una cuota
+# pequeña y una ventana corta para que el tiempo de espera por cuota sea visible. Ningún modo baja del piso
+# de la cuota (ventanas completas que hay que esperar); con la cuota como cuello de botella ambos se acercan
+# a ese piso, y por encima de él el lote gana al clasificar cada tanda mientras espera y descarga la siguiente.
+# Uso: python -m benchmarks.bench_batch_analyze --locations 50 --quota 200 --window 5
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import main
+from benchmarks.fakes import FakeSentimentBackend, FakeTwitterClient
+from rate_limiter import RateLimitScheduler
+
+
+def setup(args):
+    main.tweet_store = None
+    main.report_cache = None
+    main.rate_limiter = RateLimitScheduler(os.path.join(tempfile.mkdtemp(), "ratelimit.db"), limit=args.quota, window=args.window)
+    main.twitter_client = FakeTwitterClient(latency=args.latency)
+    main.sentiment_backend = FakeSentimentBackend(call_latency=args.model_latency)
+    main.sentiment_cache.clear()
+
+
+def run_sequential(args, locations):
+    setup(args)
+    main.TWITTER_RATELIMIT_MAX_WAIT = args.window
+    start = time.perf_counter()
+    for location in locations:
+        main.job(location)
+    return time.perf_counter() - start
+
+
+def run_batch(args, locations):
+    setup(args)
+    targets = main.batch_targets({"locations": locations})
+    start = time.perf_counter()
+    result = main.analyze_batch(targets)
+    assert len(result["comparison"]) == len(locations)
+    return time.perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark del análisis por lotes de varias ubicaciones")
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--quota", type=int, default=200, help="Consultas permitidas por ventana")
+    parser.add_argument("--window", type=float, default=5.0, help="Duración de la ventana de cuota (s)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia simulada por consulta (s)")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Costo fijo simulado por llamada al modelo (s)")
+    args = parser.parse_args()
+
+    locations = [f"Municipio {i}" for i in range(args.locations)]
+    sequential = run_sequential(args, locations)
+    sequential_model_calls = main.sentiment_backend.calls
+    batch = run_batch(args, locations)
+    print(f"{args.locations} ubicaciones, cuota {args.quota} consultas cada {args.window:.0f}s")
+    print(f"Secuencial: {sequential:.2f}s  llamadas al modelo {sequential_model_calls}")
+    print(f"Lote:       {batch:.2f}s  llamadas al modelo {main.sentiment_backend.calls}")
+    print(f"Llamadas a la API en el lote: {main.twitter_client.calls}, "
+          f"piso por cuota {(math.ceil(main.twitter_client.calls / args.quota) - 1) * args.window:.0f}s")
+    print(f"Aceleración del lote: {sequential / batch:.2f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,44 @@
+# Compara la etapa de búsqueda secuencial contra la concurrente usando un cliente falso con latencia.
+# Uso: python -m benchmarks.bench_concurrent_search --latency 0.3 --rounds 3 [--merged]
+import argparse
+import statistics
+import time
+
+import main
+from benchmarks.fakes import FakeTwitterClient
+from rate_limiter import RateLimitScheduler
+
+
+def run(max_workers, latency, rounds, merged=False):
+    main.TWITTER_MERGED_QUERIES = merged
+    main.tweet_store = None
+    main.twitter_client = FakeTwitterClient(latency=latency)
+    main.rate_limiter = RateLimitScheduler(":memory:", limit=10**9)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        results = main.fetch_concept_responses("Bogotá", max_workers=max_workers)
+        timings.append(time.perf_counter() - start)
+        assert [label for label, _, _, _ in results] == [label for label, _ in main.build_queries("Bogotá")]
+    return timings, main.twitter_client.calls // rounds
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de búsquedas concurrentes por concepto")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latencia simulada por consulta (s)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=main.TWITTER_MAX_CONCURRENCY)
+    parser.add_argument("--merged", action="store_true", help="Agrupa los conceptos en consultas combinadas")
+    args = parser.parse_args()
+
+    sequential, calls = run(1, args.latency, args.rounds, args.merged)
+    concurrent, _ = run(args.max_workers, args.latency, args.rounds, args.merged)
+    seq, conc = statistics.median(sequential), statistics.median(concurrent)
+    print(f"Consultas por reporte: {calls}, latencia simulada: {args.latency:.3f}s")
+    print(f"Secuencial (1 hilo):     {seq:.3f}s")
+    print(f"Concurrente ({args.max_workers} hilos): {conc:.3f}s")
+    print(f"Aceleración: {seq / conc:.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
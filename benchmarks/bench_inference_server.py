@@ -0,0 +1,84 @@
+# Compara N procesos con su propia copia del modelo contra N clientes del servidor de inferencia compartido.
+# Uso: python -m benchmarks.bench_inference_server --workers 4 --requests 20
+import argparse
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.fakes import synthetic_corpus
+
+
+def rss_mb(pid="self"):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def worker(mode, socket_path, backend_name, requests, texts_per_request, barrier, results):
+    if mode == "server":
+        from inference_server import InferenceClient
+        backend = InferenceClient(socket_path)
+    else:
+        from sentiment_backends import load_backend
+        backend = load_backend(backend_name)
+    texts = synthetic_corpus(requests * texts_per_request, seed=os.getpid())
+    backend.predict(texts[:texts_per_request])  # calentamiento
+    barrier.wait()
+    for i in range(0, len(texts), texts_per_request):
+        backend.predict(texts[i:i + texts_per_request])
+    results.put(rss_mb())
+
+
+def run(mode, args, socket_path):
+    barrier = multiprocessing.Barrier(args.workers + 1)
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(mode, socket_path, args.backend, args.requests,
+                                                     args.texts_per_request, barrier, results))
+        for _ in range(args.workers)
+    ]
+    for proc in procs:
+        proc.start()
+    barrier.wait()
+    start = time.perf_counter()
+    memory = [results.get() for _ in procs]
+    elapsed = time.perf_counter() - start
+    for proc in procs:
+        proc.join()
+    return elapsed, sum(memory)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark del servidor de inferencia compartido")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20, help="Solicitudes por worker")
+    parser.add_argument("--texts-per-request", type=int, default=10)
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    total = args.workers * args.requests * args.texts_per_request
+    elapsed, memory = run("local", args, None)
+    print(f"Modelo por worker:   {total / elapsed:8.1f} tweets/s  RSS total {memory:.0f}MB")
+
+    socket_path = f"/tmp/electionsapp-bench-{os.getpid()}.sock"
+    server = subprocess.Popen([sys.executable, "inference_server.py", "--socket", socket_path, "--backend", args.backend,
+                               "--max-batch-size", str(args.max_batch_size), "--max-wait-ms", str(args.max_wait_ms)])
+    try:
+        while not os.path.exists(socket_path):
+            if server.poll() is not None:
+                raise SystemExit("El servidor de inferencia no arrancó")
+            time.sleep(0.1)
+        elapsed, memory = run("server", args, socket_path)
+        memory += rss_mb(server.pid)
+        print(f"Servidor compartido: {total / elapsed:8.1f} tweets/s  RSS total {memory:.0f}MB (incluye el servidor)")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main_cli()
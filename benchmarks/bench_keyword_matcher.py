@@ -0,0 +1,56 @@
+# Compara el bucle anterior de classify_tweets (subcadenas del concepto buscado) con el matcher por lotes,
+# y con el mismo matcher llamado tweet por tweet. Se reporta el mejor de --repeat corridas.
+# Uso: python -m benchmarks.bench_keyword_matcher --tweets 100000
+import argparse
+import random
+import time
+
+import main
+from benchmarks.fakes import synthetic_corpus
+
+
+def legacy_match(tweets):
+    # Comportamiento anterior: solo el concepto de la búsqueda, por subcadena y sin quitar tildes
+    return [
+        [tweet["concept"]] if any(keyword in tweet["text"].lower() for keyword in main.PND_KEYWORDS[tweet["concept"]]) else []
+        for tweet in tweets
+    ]
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark del clasificador por palabras clave")
+    parser.add_argument("--tweets", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    keywords = [keyword for keywords in main.PND_KEYWORDS.values() for keyword in keywords]
+    texts = synthetic_corpus(args.tweets, keywords + ["educacion", "capaz", "policia"])
+    # Emojis en una parte de los tweets: quedan fuera de Latin-1 y el lote los trata como separadores
+    texts = [text + " 🙏" if i % 10 == 0 else text for i, text in enumerate(texts)]
+    tweets = [{"text": text, "concept": rng.choice(main.PND_CONCEPTS)} for text in texts]
+    matcher = main.keyword_matcher
+
+    legacy_time, legacy = best_time(lambda: legacy_match(tweets), args.repeat)
+    single_time, _ = best_time(lambda: [matcher.match(text) for text in texts], args.repeat)
+    batch_time, matched = best_time(lambda: matcher.match_many(texts), args.repeat)
+
+    print(f"{len(texts)} tweets, mejor de {args.repeat} corridas")
+    print(f"Bucle anterior:       {legacy_time:.3f}s  tweets con concepto {sum(map(bool, legacy))}")
+    print(f"Matcher, por tweet:   {single_time:.3f}s")
+    print(f"Matcher, por lotes:   {batch_time:.3f}s  tweets con concepto {sum(map(bool, matched))}, "
+          f"asignaciones {sum(map(len, matched))} (multi-etiqueta)")
+    print(f"Aceleración por lotes frente al bucle anterior: {legacy_time / batch_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,262 @@
+# Benchmark sin red de todo job(): búsqueda (respuestas grabadas o sintéticas), sentimiento, clasificación
+# y generación del reporte. Mide cada etapa, percentiles de latencia por solicitud y memoria pico, y escribe
+# los resultados en JSON para compararlos entre corridas.
+# Uso:
+#   python -m benchmarks.bench_pipeline --requests 50 --output resultados.json
+#   python -m benchmarks.bench_pipeline --fixtures grabacion.json --backend torch --baseline anterior.json
+#   python -m benchmarks.bench_pipeline --record grabacion.json [--record-from-api]
+import argparse
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import main
+from benchmarks.fakes import FakeSentimentBackend, FakeTwitterClient, RecordingTwitterClient, ReplayTwitterClient
+from rate_limiter import RateLimitScheduler
+from sentiment_backends import load_backend
+from sentiment_cache import SentimentCache
+from tweet_store import TweetStore
+
+# (etapa, función de main que la delimita); ninguna de estas funciones llama a otra de la lista
+STAGES = [
+    ("fetch", "iter_concept_responses"),
+    ("parse", "pages_to_records"),
+    ("store_load", "load_report_records"),
+    ("sentiment", "score_records"),
+    ("classify", "classify_tweets"),
+    ("chart", "get_chart_data"),
+    ("analytics", "get_trend_data"),
+    ("plan", "generate_plan_and_discourse"),
+    ("sections", "generate_report_sections"),
+    ("discurso", "generate_discurso"),
+]
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class StageTimer:
+    def __init__(self):
+        self.current = {}
+
+    def add(self, stage, start):
+        self.current[stage] = self.current.get(stage, 0.0) + time.perf_counter() - start
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                self.add(stage, start)
+            return self.iterate(stage, result) if inspect.isgenerator(result) else result
+        return timed
+
+    def iterate(self, stage, generator):
+        # En un generador solo cuenta el tiempo dentro de next(), no el del código que consume cada resultado
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                self.add(stage, start)
+            yield item
+
+    def install(self):
+        for stage, name in STAGES:
+            setattr(main, name, self.wrap(stage, getattr(main, name)))
+
+    def take(self):
+        timings, self.current = self.current, {}
+        return timings
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values_s):
+    values = [value * 1000 for value in values_s]
+    summary = {f"p{q}": percentile(values, q) for q in PERCENTILES}
+    summary.update(mean=sum(values) / len(values), max=max(values), n=len(values))
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record_fixtures(path, locations, from_api, tweets_per_query):
+    # Graba una respuesta por consulta de cada ubicación, desde la API real o desde el cliente sintético
+    if from_api:
+        recorder = RecordingTwitterClient(main.get_twitter_client())
+    else:
+        recorder = RecordingTwitterClient(FakeTwitterClient(latency=0, tweets_per_query=tweets_per_query))
+        main.rate_limiter = RateLimitScheduler(":memory:", limit=10**9)
+    main.twitter_client = recorder
+    for location in locations:
+        for _, query in main.build_queries(location):
+            main.search_with_retry(query, max_results=tweets_per_query)
+    recorder.save(path)
+    return sum(len(pages) for pages in recorder.responses.values())
+
+
+def synthetic_responses(locations, tweets_per_query):
+    recorder = RecordingTwitterClient(FakeTwitterClient(latency=0, tweets_per_query=tweets_per_query))
+    for location in locations:
+        for _, query in main.build_queries(location):
+            recorder.search_recent_tweets(query, max_results=tweets_per_query)
+    return recorder.responses
+
+
+def setup(args):
+    if args.fixtures:
+        client = ReplayTwitterClient.from_file(args.fixtures, latency=args.latency)
+    else:
+        client = ReplayTwitterClient(synthetic_responses(args.location_names, args.tweets_per_query), latency=args.latency)
+    main.twitter_client = client
+    main.rate_limiter = RateLimitScheduler(":memory:", limit=10**9)
+    main.tweet_store = TweetStore(os.path.join(tempfile.mkdtemp(), "tweets.db")) if args.store else None
+    main.report_cache = None
+    # Sin caché de sentimiento, cada solicitud pasa por el modelo como en una consulta nueva
+    main.sentiment_cache = SentimentCache(max_entries=10**6 if args.sentiment_cache else 0)
+    backend_options = {"onnx_path": os.getenv("SENTIMENT_ONNX_PATH")} if args.backend == "onnx" else {}
+    start = time.perf_counter()
+    if args.backend == "fake":
+        main.sentiment_backend = FakeSentimentBackend(call_latency=0, item_latency=0)
+    else:
+        main.sentiment_backend = load_backend(args.backend, **backend_options)
+    return time.perf_counter() - start
+
+
+def run(args):
+    load_s = setup(args)
+    timer = StageTimer()
+    timer.install()
+
+    for location in args.location_names[:args.warmup]:
+        main.job(location)
+    timer.take()
+
+    totals, stages = [], {stage: [] for stage, _ in STAGES}
+    for i in range(args.requests):
+        location = args.location_names[i % len(args.location_names)]
+        start = time.perf_counter()
+        report, _ = main.job(location, "Candidato Benchmark")
+        totals.append(time.perf_counter() - start)
+        if "error" in report:
+            raise RuntimeError(f"job() falló para {location}: {report['error']}")
+        timings = timer.take()
+        for stage, _ in STAGES:
+            stages[stage].append(timings.get(stage, 0.0))
+
+    # Memoria pico en una corrida aparte: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    main.job(args.location_names[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timer.take()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "fixtures": args.fixtures or "synthetic",
+            "args": {key: value for key, value in vars(args).items() if key != "location_names"},
+        },
+        "backend_load_s": load_s,
+        "api_calls": main.twitter_client.calls,
+        "latency_ms": {"total": summarize(totals), "stages": {stage: summarize(values) for stage, values in stages.items()}},
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def compare(result, baseline, threshold):
+    # Devuelve las métricas que empeoraron más del umbral respecto a la corrida base
+    regressions = []
+    rows = [("total", result["latency_ms"]["total"], baseline["latency_ms"]["total"])]
+    rows += [(stage, values, baseline["latency_ms"]["stages"].get(stage)) for stage, values in result["latency_ms"]["stages"].items()]
+    print(f"\n{'Etapa':<12} {'p50 base':>10} {'p50':>10} {'cambio':>8}   {'p95 base':>10} {'p95':>10} {'cambio':>8}")
+    for name, current, previous in rows:
+        if not previous:
+            continue
+        cells = []
+        for key in ("p50", "p95"):
+            change = (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+            cells.append(f"{previous[key]:>10.2f} {current[key]:>10.2f} {change:>+7.1f}%")
+            if change > threshold and current[key] - previous[key] > 1:
+                regressions.append(f"{name} {key}: {previous[key]:.2f} -> {current[key]:.2f} ms ({change:+.1f}%)")
+        print(f"{name:<12} " + "   ".join(cells))
+    previous_peak = baseline.get("peak_memory_mb")
+    if previous_peak and result["peak_memory_mb"] > previous_peak * (1 + threshold / 100):
+        regressions.append(f"memoria pico: {previous_peak:.1f} -> {result['peak_memory_mb']:.1f} MB")
+    return regressions
+
+
+def print_result(result):
+    total = result["latency_ms"]["total"]
+    print(f"Backend {result['meta']['backend']}, {total['n']} solicitudes, {result['api_calls']} llamadas a la API")
+    print(f"Total:  p50 {total['p50']:.2f} ms  p90 {total['p90']:.2f} ms  p95 {total['p95']:.2f} ms  p99 {total['p99']:.2f} ms")
+    for stage, values in result["latency_ms"]["stages"].items():
+        print(f"  {stage:<12} p50 {values['p50']:9.2f} ms  p95 {values['p95']:9.2f} ms  media {values['mean']:9.2f} ms")
+    print(f"Memoria pico (tracemalloc): {result['peak_memory_mb']:.1f} MB")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark sin red del pipeline completo de job()")
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--locations", type=int, default=5, help="Ubicaciones distintas que se alternan")
+    parser.add_argument("--backend", default="fake", help="Backend de sentimiento (fake, torch, torch-int8, onnx)")
+    parser.add_argument("--fixtures", help="Respuestas grabadas (JSON); sin este archivo se generan sintéticas")
+    parser.add_argument("--tweets-per-query", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia simulada por consulta (s)")
+    parser.add_argument("--store", action="store_true", help="Usa un almacén de tweets temporal")
+    parser.add_argument("--sentiment-cache", action="store_true", help="Conserva la caché de sentimiento entre solicitudes")
+    parser.add_argument("--output", help="Escribe los resultados en este archivo JSON")
+    parser.add_argument("--baseline", help="Resultados JSON de una corrida anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Empeoramiento (%%) que se considera regresión")
+    parser.add_argument("--record", help="Graba respuestas en este archivo JSON y termina")
+    parser.add_argument("--record-from-api", action="store_true", help="Graba desde la API real (requiere BEARER_TOKEN)")
+    args = parser.parse_args()
+    args.location_names = ["Bogotá", "Medellín", "Cali", "Barranquilla", "Cartagena"][:args.locations]
+    args.location_names += [f"Municipio {i}" for i in range(len(args.location_names), args.locations)]
+
+    if args.record:
+        count = record_fixtures(args.record, args.location_names, args.record_from_api, args.tweets_per_query)
+        print(f"{count} respuestas grabadas en {args.record}")
+        return
+
+    result = run(args)
+    print_result(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegresiones:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
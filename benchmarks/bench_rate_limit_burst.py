@@ -0,0 +1,52 @@
+# Simula una ráfaga de solicitudes /analyze contra una cuota pequeña y compartida.
+# Las solicitudes sin cupo deben fallar rápido con retry-after en lugar de bloquear al worker.
+# Uso: python -m benchmarks.bench_rate_limit_burst --requests 20 --quota 60
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main
+from benchmarks.fakes import FakeTwitterClient
+from rate_limiter import RateLimitExceeded, RateLimitScheduler
+
+
+def one_request(location):
+    start = time.perf_counter()
+    try:
+        main.fetch_concept_responses(location)
+        outcome = "servida"
+    except RateLimitExceeded as e:
+        outcome = f"diferida ({e.retry_after:.0f}s)"
+    return outcome, time.perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de ráfagas contra la cuota compartida")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--quota", type=int, default=60, help="Consultas permitidas en la ventana")
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "ratelimit.db")
+    main.rate_limiter = RateLimitScheduler(db_path, limit=args.quota, window=900)
+    main.tweet_store = None
+    main.twitter_client = FakeTwitterClient(latency=args.latency)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.requests) as executor:
+        results = list(executor.map(one_request, [f"Ciudad {i}" for i in range(args.requests)]))
+    wall = time.perf_counter() - start
+
+    served = [elapsed for outcome, elapsed in results if outcome == "servida"]
+    deferred = [elapsed for outcome, elapsed in results if outcome != "servida"]
+    print(f"Ráfaga de {args.requests} solicitudes, cuota {args.quota} consultas, {wall:.2f}s en total")
+    print(f"Servidas:  {len(served):3d}  latencia mediana {statistics.median(served) if served else 0:.3f}s")
+    print(f"Diferidas: {len(deferred):3d}  latencia mediana {statistics.median(deferred) if deferred else 0:.3f}s")
+    print(f"Llamadas a la API: {main.twitter_client.calls}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,63 @@
+# Mide /analyze con la caché de reportes: primer pedido (miss), repetido (hit), otro candidato sobre el
+# mismo análisis y entrada vencida (stale). La búsqueda y el modelo se reemplazan por un análisis sintético
+# con latencia fija. Uso: python -m benchmarks.bench_report_cache --tweets 1000 --latency 2
+import argparse
+import random
+import statistics
+import time
+
+import main
+from benchmarks.fakes import synthetic_corpus
+from report_cache import ReportCache
+
+
+def fake_analyze_location(tweets, latency):
+    def analyze(location="Bogotá", politician=None):
+        time.sleep(latency)
+        return main.with_report_sections(main.build_analysis(tweets, location), location)
+    return analyze
+
+
+def timed_post(client, payload):
+    start = time.perf_counter()
+    response = client.post("/analyze", json=payload)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.get_json()
+    return elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de la caché de reportes de /analyze")
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=2.0, help="Duración simulada de búsqueda + modelo (s)")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    keywords = [keyword for keywords in main.PND_KEYWORDS.values() for keyword in keywords]
+    tweets = [
+        {"id": i, "text": text, "concept": rng.choice(main.PND_CONCEPTS), "sentiment": rng.choice(["positivo", "negativo", "neutral"])}
+        for i, text in enumerate(synthetic_corpus(args.tweets, keywords))
+    ]
+    main.analyze_location = fake_analyze_location(tweets, args.latency)
+    main.report_cache = ReportCache(ttl=3600, stale_ttl=3600)
+    client = main.app.test_client()
+    payload = {"location": "Bogotá", "candidate_name": "Candidato A"}
+
+    miss = timed_post(client, payload)
+    hits = [timed_post(client, payload) for _ in range(args.rounds)]
+    other_candidate = [timed_post(client, dict(payload, candidate_name=f"Candidato {i}")) for i in range(args.rounds)]
+    main.report_cache.ttl = 0
+    stale = timed_post(client, payload)
+
+    print(f"{args.tweets} tweets, latencia simulada {args.latency:.1f}s")
+    print(f"Miss:                    {miss * 1000:.1f} ms")
+    print(f"Hit (mediana):           {statistics.median(hits) * 1000:.1f} ms")
+    print(f"Otro candidato (mediana): {statistics.median(other_candidate) * 1000:.1f} ms")
+    print(f"Stale (recarga en fondo): {stale * 1000:.1f} ms")
+    time.sleep(args.latency + 0.5)
+    print(f"Métricas: {main.report_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main_cli()
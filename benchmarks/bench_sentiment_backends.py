@@ -0,0 +1,77 @@
+# Compara latencia, throughput y memoria residente de cada backend de sentimiento.
+# Cada backend corre en su propio subproceso para que la medición de memoria no se contamine.
+# Uso: python -m benchmarks.bench_sentiment_backends --tweets 256 --batch-size 32
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from sentiment_backends import BACKENDS
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def run_single(name, tweets, batch_size, rounds):
+    from benchmarks.fakes import synthetic_corpus
+    from sentiment_backends import load_backend
+
+    texts = synthetic_corpus(tweets)
+    start = time.perf_counter()
+    backend = load_backend(name)
+    load_time = time.perf_counter() - start
+    backend.predict(texts[:batch_size])  # calentamiento
+
+    batch_latencies, totals = [], []
+    for _ in range(rounds):
+        round_start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            batch_start = time.perf_counter()
+            backend.predict(texts[i:i + batch_size])
+            batch_latencies.append(time.perf_counter() - batch_start)
+        totals.append(time.perf_counter() - round_start)
+
+    return {
+        "backend": name,
+        "load_s": load_time,
+        "batch_p50_ms": statistics.median(batch_latencies) * 1000,
+        "throughput_tps": tweets / statistics.median(totals),
+        "rss_mb": current_rss_mb(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de sentimiento")
+    parser.add_argument("--tweets", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args.tweets, args.batch_size, args.rounds)))
+        return
+
+    print(f"{'backend':<12}{'carga s':>10}{'lote p50 ms':>14}{'tweets/s':>12}{'RSS MB':>10}{'pico MB':>10}")
+    for name in args.backends:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_sentiment_backends", "--single", name,
+             "--tweets", str(args.tweets), "--batch-size", str(args.batch_size), "--rounds", str(args.rounds)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{name:<12} error: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{name:<12}{r['load_s']:>10.2f}{r['batch_p50_ms']:>14.1f}{r['throughput_tps']:>12.1f}{r['rss_mb']:>10.0f}{r['peak_rss_mb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,49 @@
+# Compara diez lotes pequeños por concepto contra una sola pasada agrupada por longitud.
+# Uso: python -m benchmarks.bench_sentiment_batching --tweets 100 --rounds 5
+import argparse
+import statistics
+import time
+
+import main
+from benchmarks.fakes import synthetic_corpus
+
+
+def per_concept(texts, concepts=10):
+    # Comportamiento anterior: un lote por concepto, cada uno con su propio padding
+    chunk = max(1, len(texts) // concepts)
+    results = []
+    for i in range(0, len(texts), chunk):
+        results.extend(main.analyze_sentiment_batch(texts[i:i + chunk]))
+    return results
+
+
+def measure(fn, texts, rounds):
+    fn(texts[:8])  # calentamiento
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(texts)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia de sentimiento por lotes")
+    parser.add_argument("--tweets", type=int, default=100, help="Tweets por solicitud simulada")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-batch-size", type=int, default=main.SENTIMENT_MAX_BATCH_SIZE)
+    args = parser.parse_args()
+
+    keywords = [keyword for keywords in main.PND_KEYWORDS.values() for keyword in keywords]
+    texts = synthetic_corpus(args.tweets, keywords)
+    baseline = measure(per_concept, texts, args.rounds)
+    bucketed = measure(lambda t: main.analyze_sentiment_bucketed(t, args.max_batch_size), texts, args.rounds)
+
+    print(f"Corpus sintético: {len(texts)} tweets, lote máximo {args.max_batch_size}")
+    for name, timings in (("Por concepto", baseline), ("Agrupado por longitud", bucketed)):
+        latency = statistics.median(timings)
+        print(f"{name:<22} latencia {latency:.3f}s  throughput {len(texts) / latency:.1f} tweets/s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,46 @@
+# Mide el arranque en frío: tiempo de importación de main, memoria residente y primera respuesta de "/".
+# Uso: python -m benchmarks.bench_startup --rounds 3
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, resource, time
+start = time.perf_counter()
+import main
+import_s = time.perf_counter() - start
+client = main.app.test_client()
+start = time.perf_counter()
+status = client.get("/").status_code
+first_request_s = time.perf_counter() - start
+with open("/proc/self/statm") as f:
+    rss_mb = int(f.read().split()[1]) * resource.getpagesize() / 2**20
+print(json.dumps({"import_s": import_s, "first_request_s": first_request_s, "status": status, "rss_mb": rss_mb}))
+"""
+
+
+def probe(warmup):
+    env = dict(os.environ, SENTIMENT_WARMUP="1" if warmup else "0")
+    proc = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de la aplicación")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    for label, warmup in (("Perezoso (por defecto)", False), ("Con warm-up", True)):
+        runs = [probe(warmup) for _ in range(args.rounds)]
+        print(
+            f"{label:<24} import {statistics.median(r['import_s'] for r in runs):.2f}s  "
+            f"GET / {statistics.median(r['first_request_s'] for r in runs) * 1000:.1f}ms  "
+            f"RSS {statistics.median(r['rss_mb'] for r in runs):.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
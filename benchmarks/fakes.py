@@ -0,0 +1,183 @@
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import tweepy
+
+# Frases sintéticas en español para construir tweets de prueba
+SAMPLE_PHRASES = [
+    "La {keyword} en {location} está cada vez peor, nadie hace nada",
+    "Excelente noticia para {location}: avanzan los proyectos de {keyword}",
+    "¿Alguien sabe qué pasó con la {keyword} en {location}? No hay información",
+    "Hoy se discutió en el concejo de {location} el tema de {keyword}",
+    "Gracias a la alcaldía por mejorar la {keyword}, {location} lo necesitaba",
+    "Otra vez promesas sobre {keyword} en {location} y cero resultados",
+    "Muy preocupante la situación de {keyword} en varios barrios de {location}",
+    "Buen debate sobre {keyword} esta noche, ojalá {location} escuche",
+]
+
+# Colas de texto para que los tweets sintéticos tengan longitudes variadas
+FILLERS = [
+    "",
+    " #Elecciones2026",
+    " Ya es hora de que alguien tome decisiones serias y deje de improvisar.",
+    " Llevamos años escuchando lo mismo en cada campaña, los ciudadanos merecemos respuestas claras,"
+    " presupuestos públicos y seguimiento real a cada compromiso que se firma frente a la comunidad.",
+]
+
+DEFAULT_KEYWORDS = ["seguridad", "comida", "transporte", "corrupción", "igualdad", "paz", "empleo", "clima", "educación", "salud"]
+
+
+def synthetic_corpus(size, keywords=DEFAULT_KEYWORDS, location="Bogotá", seed=0):
+    rng = random.Random(seed)
+    return [
+        rng.choice(SAMPLE_PHRASES).format(keyword=rng.choice(keywords), location=location) + rng.choice(FILLERS)
+        for _ in range(size)
+    ]
+
+
+def make_tweet_data(tweet_id, text, author_id, created_at=None, likes=0, retweets=0):
+    created_at = created_at or datetime.now(timezone.utc)
+    return {
+        "id": str(tweet_id),
+        "text": text,
+        "edit_history_tweet_ids": [str(tweet_id)],
+        "author_id": str(author_id),
+        "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "public_metrics": {"like_count": likes, "retweet_count": retweets, "reply_count": 0, "quote_count": 0},
+    }
+
+
+def make_response(tweets_data, users_data, meta=None):
+    return tweepy.Response(
+        data=[tweepy.Tweet(t) for t in tweets_data] or None,
+        includes={"users": [tweepy.User(u) for u in users_data]},
+        errors=[],
+        meta=meta or {"result_count": len(tweets_data)},
+    )
+
+
+class FakeTwitterClient:
+    # Sustituto de tweepy.Client que genera respuestas sintéticas con latencia inyectada
+    def __init__(self, latency=0.2, tweets_per_query=10, location="Bogotá", seed=0):
+        self.latency = latency
+        self.tweets_per_query = tweets_per_query
+        self.location = location
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1_000_000)
+        self._lock = threading.Lock()
+
+    def search_recent_tweets(self, query, max_results=10, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            keywords = query.split("(", 1)[-1].split(")", 1)[0].split(" OR ")
+            now = datetime.now(timezone.utc)
+            tweets, users = [], []
+            for _ in range(min(max_results, self.tweets_per_query)):
+                tweet_id = next(self._ids)
+                author_id = self._random.randint(1, 500)
+                text = self._random.choice(SAMPLE_PHRASES).format(
+                    keyword=self._random.choice(keywords), location=self.location
+                )
+                created_at = now - timedelta(minutes=self._random.randint(0, 7 * 24 * 60))
+                tweets.append(make_tweet_data(tweet_id, text, author_id, created_at,
+                                              likes=self._random.randint(0, 200),
+                                              retweets=self._random.randint(0, 50)))
+                users.append({"id": str(author_id), "name": f"Usuario {author_id}", "username": f"usuario{author_id}"})
+        return make_response(tweets, users)
+
+
+def response_to_fixture(response):
+    includes = {key: [item.data for item in items] for key, items in (response.includes or {}).items()}
+    return {"data": [tweet.data for tweet in response.data or []], "includes": includes, "meta": response.meta or {}}
+
+
+def fixture_to_response(page, next_token=None):
+    meta = dict(page.get("meta") or {}, result_count=len(page["data"]))
+    meta.pop("next_token", None)
+    if next_token:
+        meta["next_token"] = next_token
+    return make_response(page["data"], page.get("includes", {}).get("users", []), meta)
+
+
+class RecordingTwitterClient:
+    # Envuelve un cliente (real o falso) y guarda cada respuesta por consulta para reproducirla después
+    def __init__(self, client):
+        self.client = client
+        self.responses = {}
+        self._lock = threading.Lock()
+
+    def search_recent_tweets(self, query, **kwargs):
+        response = self.client.search_recent_tweets(query, **kwargs)
+        with self._lock:
+            self.responses.setdefault(query, []).append(response_to_fixture(response))
+        return response
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"responses": self.responses}, f, ensure_ascii=False)
+
+
+class ReplayTwitterClient:
+    # Sustituto de tweepy.Client que reproduce respuestas grabadas (archivo JSON de RecordingTwitterClient),
+    # sin red. Una consulta no grabada recibe, de forma determinista, las páginas de otra consulta
+    def __init__(self, responses, latency=0.0):
+        self.responses = responses
+        self.latency = latency
+        self.calls = 0
+        self._queries = sorted(responses)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, latency=0.0):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["responses"], latency)
+
+    def pages_for(self, query):
+        if query in self.responses:
+            return self.responses[query]
+        index = sum(query.encode("utf-8")) % len(self._queries)
+        return self.responses[self._queries[index]]
+
+    def search_recent_tweets(self, query, max_results=10, next_token=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+        pages = self.pages_for(query)
+        page_index = int(next_token or 0)
+        page = pages[page_index]
+        following = str(page_index + 1) if page_index + 1 < len(pages) else None
+        return fixture_to_response(dict(page, data=page["data"][:max_results]), following)
+
+
+class FakeSentimentBackend:
+    # Sustituto del modelo: costo fijo por llamada (ida y vuelta) más un costo por texto. La etiqueta sale de
+    # contar palabras de un léxico mínimo, así un mismo texto recibe siempre el mismo sentimiento
+    name = "fake"
+
+    POSITIVE = {"excelente", "gracias", "buen", "buena", "bueno", "mejor", "mejorar", "avanzan", "avance", "apoyo", "bien"}
+    NEGATIVE = {"peor", "nadie", "cero", "preocupante", "crisis", "corrupción", "corrupcion", "robo", "mal", "falla", "promesas"}
+
+    def __init__(self, call_latency=0.05, item_latency=0.001):
+        self.call_latency = call_latency
+        self.item_latency = item_latency
+        self.calls = 0
+
+    def token_lengths(self, texts):
+        return [len(text.split()) for text in texts]
+
+    def label(self, text):
+        words = [word.strip(".,;:!?¿¡#@\"'()") for word in text.lower().split()]
+        score = sum(word in self.POSITIVE for word in words) - sum(word in self.NEGATIVE for word in words)
+        return "positivo" if score > 0 else "negativo" if score < 0 else "neutral"
+
+    def predict(self, texts):
+        time.sleep(self.call_latency + self.item_latency * len(texts))
+        self.calls += 1
+        return [self.label(text) for text in texts]
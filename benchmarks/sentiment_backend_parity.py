@@ -0,0 +1,40 @@
+# Mide con qué frecuencia cada backend coincide con las etiquetas del modelo fp32 original.
+# Uso: python -m benchmarks.sentiment_backend_parity --tweets 500 --backends torch-int8 onnx
+import argparse
+from collections import Counter
+
+from benchmarks.fakes import synthetic_corpus
+from sentiment_backends import BACKENDS, load_backend
+
+
+def predict_all(backend, texts, batch_size):
+    labels = []
+    for i in range(0, len(texts), batch_size):
+        labels.extend(backend.predict(texts[i:i + batch_size]))
+    return labels
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Paridad de etiquetas entre backends de sentimiento")
+    parser.add_argument("--tweets", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", nargs="+", default=[name for name in BACKENDS if name != "torch"])
+    args = parser.parse_args()
+
+    texts = synthetic_corpus(args.tweets)
+    reference = predict_all(load_backend("torch"), texts, args.batch_size)
+    print(f"Referencia torch fp32: {dict(Counter(reference))}")
+
+    for name in args.backends:
+        try:
+            labels = predict_all(load_backend(name), texts, args.batch_size)
+        except Exception as e:
+            print(f"{name:<12} no disponible: {e}")
+            continue
+        agreement = sum(a == b for a, b in zip(reference, labels)) / len(texts) * 100
+        disagreements = Counter((a, b) for a, b in zip(reference, labels) if a != b)
+        print(f"{name:<12} coincidencia {agreement:.2f}%  discrepancias {dict(disagreements)}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,161 @@
+# Exportación por streaming de tweets clasificados y filas del plan en JSONL, CSV o Parquet. Los escritores
+# consumen un generador de filas y producen bloques de bytes, así que la memoria no depende del tamaño total.
+# Uso:
+#   python -m export --kind tweets --format csv --location Bogotá --output tweets.csv
+#   python -m export --kind plan --format jsonl --location Medellín --politician petrogustavo
+import argparse
+import csv
+import io
+import json
+import sys
+
+# Tamaño aproximado (bytes) de cada bloque de texto y filas por grupo de filas en Parquet
+CHUNK_BYTES = 64 * 1024
+PARQUET_ROW_GROUP = 5000
+
+CONTENT_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Tipos de columna para Parquet; el resto (incluido el ID del tweet) se escribe como texto
+INT_COLUMNS = {"like_count", "retweet_count", "reply_count", "quote_count", "positivo", "negativo", "neutral"}
+FLOAT_COLUMNS = {"negativo_pct"}
+
+
+class ExportUnavailable(Exception):
+    # El formato pedido no se puede generar en esta instalación (falta una dependencia opcional)
+    pass
+
+
+def iter_jsonl(rows, columns=None):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row if columns is None else {column: row.get(column) for column in columns},
+                          ensure_ascii=False, default=str) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def iter_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    # Destino de ParquetWriter que acumula lo escrito hasta que el generador lo entrega
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def iter_parquet(rows, columns, row_group_size=PARQUET_ROW_GROUP):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ExportUnavailable("La exportación a Parquet requiere el paquete pyarrow") from e
+
+    schema = pa.schema([
+        (column, pa.int64() if column in INT_COLUMNS else pa.float64() if column in FLOAT_COLUMNS else pa.string())
+        for column in columns
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+
+    def write_group(group):
+        data = {column: [row.get(column) for row in group] for column in columns}
+        for column in columns:
+            if schema.field(column).type == pa.string():
+                data[column] = [None if value is None else str(value) for value in data[column]]
+        writer.write_table(pa.Table.from_pydict(data, schema=schema))
+
+    group = []
+    for row in rows:
+        group.append(row)
+        if len(group) >= row_group_size:
+            write_group(group)
+            group = []
+            yield sink.drain()
+    if group:
+        write_group(group)
+    writer.close()
+    yield sink.drain()
+
+
+WRITERS = {"jsonl": iter_jsonl, "csv": iter_csv, "parquet": iter_parquet}
+
+
+def iter_export(rows, columns, fmt, row_group_size=PARQUET_ROW_GROUP):
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}. Opciones: {', '.join(WRITERS)}")
+    if fmt == "parquet":
+        return iter_parquet(rows, columns, row_group_size)
+    return WRITERS[fmt](rows, columns)
+
+
+def write_export(rows, columns, fmt, output, row_group_size=PARQUET_ROW_GROUP):
+    # output: ruta o archivo binario abierto; devuelve los bytes escritos
+    written = 0
+    target = open(output, "wb") if isinstance(output, str) else output
+    try:
+        for chunk in iter_export(rows, columns, fmt, row_group_size):
+            target.write(chunk)
+            written += len(chunk)
+    finally:
+        if isinstance(output, str):
+            target.close()
+    return written
+
+
+def main_cli():
+    import main
+
+    parser = argparse.ArgumentParser(description="Exporta tweets clasificados o el plan por concepto")
+    parser.add_argument("--kind", choices=list(main.EXPORT_KINDS), default="tweets")
+    parser.add_argument("--format", choices=list(WRITERS), default="jsonl")
+    parser.add_argument("--location", default="Bogotá")
+    parser.add_argument("--politician", default=None)
+    parser.add_argument("--days", type=int, default=None, help="Solo tweets de los últimos N días")
+    parser.add_argument("--output", help="Archivo de salida (por defecto, la salida estándar)")
+    args = parser.parse_args()
+
+    rows, columns = main.export_rows(args.kind, args.location, args.politician, args.days)
+    written = write_export(rows, columns, args.format, args.output or sys.stdout.buffer, main.EXPORT_CHUNK_ROWS)
+    if args.output:
+        print(f"{written} bytes escritos en {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main_cli()
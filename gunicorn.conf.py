@@ -0,0 +1,19 @@
+import gc
+import os
+
+# Configuración de gunicorn: gunicorn main:app
+# Sin GUNICORN_BIND se respeta el bind de gunicorn (-b, GUNICORN_CMD_ARGS, PORT o 127.0.0.1:8000)
+if os.getenv("GUNICORN_BIND"):
+    bind = os.getenv("GUNICORN_BIND")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Con preload el maestro importa main una sola vez; si además SENTIMENT_WARMUP=1 el modelo
+# queda cargado antes del fork y los workers comparten sus páginas de memoria (copy-on-write)
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def pre_fork(server, worker):
+    # Mueve los objetos ya creados a la generación permanente del GC para que las
+    # recolecciones en los workers no escriban sobre las páginas compartidas
+    gc.freeze()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+from sentiment_backends import bucket_by_length, load_backend
+
+logger = logging.getLogger(__name__)
+
+# Cada mensaje es un entero de 4 bytes (big-endian) con la longitud seguido del JSON
+HEADER = struct.Struct(">I")
+
+
+def send_message(sock, payload):
+    data = json.dumps(payload).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Conexión cerrada por el otro extremo")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    (size,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+class MicroBatcher:
+    # Junta las solicitudes de todos los clientes en lotes de hasta max_batch_size textos,
+    # esperando como máximo max_wait_ms desde la primera solicitud pendiente
+    def __init__(self, backend, max_batch_size=64, max_wait_ms=10):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        future = Future()
+        if not texts:
+            future.set_result([])
+        else:
+            self._queue.put((texts, future))
+        return future
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                labels = self._predict(texts)
+            except Exception as e:
+                logger.error(f"Error in micro-batch of {len(texts)} texts: {e}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for item_texts, future in pending:
+                future.set_result(labels[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    def _predict(self, texts):
+        labels = [None] * len(texts)
+        lengths = self.backend.token_lengths(texts)
+        for bucket in bucket_by_length(lengths, self.max_batch_size):
+            for i, label in zip(bucket, self.backend.predict([texts[i] for i in bucket])):
+                labels[i] = label
+        self.batches += 1
+        self.texts += len(texts)
+        return labels
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Conexión persistente: un cliente puede enviar varias solicitudes seguidas
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response = {"labels": self.server.batcher.submit(message.get("texts", [])).result()}
+            except Exception as e:
+                response = {"error": str(e)}
+            try:
+                send_message(self.request, response)
+            except OSError:
+                # El cliente se desconectó (p. ej. por timeout) antes de recibir la respuesta
+                return
+
+
+class InferenceServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, batcher):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.batcher = batcher
+        super().__init__(socket_path, _Handler)
+
+
+class InferenceClient:
+    # Cliente del servidor de inferencia; expone predict() como un backend local.
+    # Mantiene una conexión por hilo y por proceso (los workers de gunicorn se crean con fork)
+    batches_remotely = True
+
+    def __init__(self, socket_path, timeout=60):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None or self._local.pid != os.getpid():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def predict(self, texts):
+        if not texts:
+            return []
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_message(sock, {"texts": list(texts)})
+                response = recv_message(sock)
+                break
+            except socket.timeout:
+                # El servidor sigue procesando el lote: reenviarlo duplicaría el trabajo. La conexión se
+                # descarta porque la respuesta tardía llegaría como respuesta a la siguiente solicitud
+                self._reset()
+                raise
+            except (ConnectionError, OSError):
+                # Conexión caída (p. ej. el servidor se reinició): se reintenta una vez con una conexión nueva
+                self._reset()
+                if attempt:
+                    raise
+        if "error" in response:
+            raise RuntimeError(f"Error del servidor de inferencia: {response['error']}")
+        return response["labels"]
+
+
+def main_cli():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Servidor local de inferencia de sentimiento con micro-batching")
+    parser.add_argument("--socket", default=os.getenv("SENTIMENT_SERVER_SOCKET", "/tmp/electionsapp-sentiment.sock"))
+    parser.add_argument("--backend", default=os.getenv("SENTIMENT_BACKEND", "torch"))
+    parser.add_argument("--max-batch-size", type=int, default=int(os.getenv("SENTIMENT_SERVER_MAX_BATCH_SIZE", "64")))
+    parser.add_argument("--max-wait-ms", type=float, default=float(os.getenv("SENTIMENT_SERVER_MAX_WAIT_MS", "10")))
+    args = parser.parse_args()
+
+    backend_options = {"onnx_path": os.getenv("SENTIMENT_ONNX_PATH")} if args.backend == "onnx" else {}
+    batcher = MicroBatcher(load_backend(args.backend, **backend_options), args.max_batch_size, args.max_wait_ms)
+    with InferenceServer(args.socket, batcher) as server:
+        logger.info(f"Sentiment inference server listening on {args.socket} (batch {args.max_batch_size}, wait {args.max_wait_ms}ms)")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main_cli()
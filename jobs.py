@@ -0,0 +1,135 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from per_process import PerProcess, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    retry_after REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_key ON tasks (key, status);
+"""
+
+ACTIVE = ("queued", "running")
+
+
+class JobQueue:
+    # Cola de trabajos en segundo plano. El estado vive en SQLite para que cualquier worker de gunicorn
+    # pueda responder GET /jobs/<id>, aunque la tarea se ejecute en el worker que la recibió.
+    # Los trabajos con la misma clave que ya estén en curso comparten una única tarea. Mientras una tarea
+    # corre, su worker renueva updated_at cada heartbeat segundos; si pasan timeout segundos sin renovarse
+    # se da por perdida (el worker terminó), sin importar cuánto dure la tarea.
+    def __init__(self, db_path, max_workers=2, timeout=900, ttl=3600, heartbeat=None):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.ttl = ttl
+        self.heartbeat = heartbeat or max(1.0, min(60.0, timeout / 3))
+        self._lock = threading.Lock()
+        self._connection = PerProcess(lambda: connect_sqlite(self.db_path, SCHEMA, isolation_level=None))
+        self._executor = PerProcess(lambda: ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job"))
+
+    def submit(self, key, fn, args=(), params=None):
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._purge(conn, now)
+                row = conn.execute(
+                    f"SELECT task_id FROM tasks WHERE key = ? AND status IN ({','.join('?' * len(ACTIVE))}) "
+                    "AND updated_at > ? ORDER BY created_at DESC LIMIT 1",
+                    (key, *ACTIVE, now - self.timeout)
+                ).fetchone()
+                task_id, is_new = (row[0], False) if row else (uuid.uuid4().hex, True)
+                if is_new:
+                    conn.execute(
+                        "INSERT INTO tasks (task_id, key, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                        (task_id, key, now, now)
+                    )
+                conn.execute(
+                    "INSERT INTO jobs (job_id, task_id, params, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, task_id, json.dumps(params or {}), now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if is_new:
+                self._executor().submit(self._run, task_id, fn, args)
+            else:
+                logger.info(f"Job {job_id} merged into in-flight task {task_id} ({key})")
+        return job_id
+
+    def _purge(self, conn, now):
+        conn.execute("DELETE FROM jobs WHERE created_at < ?", (now - self.ttl,))
+        conn.execute("DELETE FROM tasks WHERE updated_at < ? AND task_id NOT IN (SELECT task_id FROM jobs)", (now - self.ttl,))
+
+    def _update(self, task_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._connection().execute(f"UPDATE tasks SET {assignments} WHERE task_id = ?", (*fields.values(), task_id))
+
+    def _beat(self, task_id, stop):
+        while not stop.wait(self.heartbeat):
+            try:
+                self._update(task_id)
+            except sqlite3.Error as e:
+                logger.error(f"Error renewing background task {task_id}: {e}")
+
+    def _run(self, task_id, fn, args):
+        self._update(task_id, status="running")
+        stop = threading.Event()
+        threading.Thread(target=self._beat, args=(task_id, stop), name="job-heartbeat", daemon=True).start()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            logger.error(f"Error in background task {task_id}: {e}")
+            self._update(task_id, status="error", error=str(e), retry_after=getattr(e, "retry_after", None))
+            return
+        finally:
+            stop.set()
+        self._update(task_id, status="done", result=json.dumps(result, default=str))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT j.params, t.status, t.result, t.error, t.retry_after, t.updated_at "
+                "FROM jobs j JOIN tasks t ON t.task_id = j.task_id WHERE j.job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        params, status, result, error, retry_after, updated_at = row
+        if status in ACTIVE and updated_at < time.time() - self.timeout:
+            status, error = "error", "El worker del trabajo dejó de responder"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "params": json.loads(params),
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "retry_after": retry_after,
+        }
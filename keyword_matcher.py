@@ -0,0 +1,163 @@
+import re
+import unicodedata
+from itertools import compress
+
+
+def _build_fold_table():
+    # Quita tildes y diéresis (á -> a, ü -> u) pero conserva la ñ, que en español es otra letra
+    table = {}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        if char in "ñÑ":
+            continue
+        base = unicodedata.normalize("NFD", char)[0]
+        if base != char and base.isascii():
+            table[code] = base.lower()
+    return table
+
+
+FOLD_TABLE = _build_fold_table()
+
+
+def fold(text):
+    # NFC primero: en NFD la tilde es un carácter aparte ("o" + U+0301) que la tabla no quitaría
+    return unicodedata.normalize("NFC", text).lower().translate(FOLD_TABLE)
+
+
+def _build_byte_table():
+    # Tabla para bytes.translate sobre texto codificado en Latin-1: pasa a minúsculas, quita tildes y convierte
+    # la puntuación y los símbolos en espacios en una sola llamada. La ñ queda como \x01 para no confundirse
+    # con la n. Las letras de Latin-1 sin equivalente ASCII (ß, æ, ø...) se conservan y ese texto pasa por la
+    # expresión regular
+    table = bytearray(range(256))
+    for code in range(256):
+        char = chr(code)
+        if char == "\x00" or char.isascii() and char.isspace():
+            continue
+        if char in "ñÑ":
+            table[code] = 1
+        elif code in FOLD_TABLE:
+            table[code] = ord(FOLD_TABLE[code])
+        elif char.isascii() and char.isalnum() or char == "_":
+            table[code] = ord(char.lower())
+        elif not char.isalnum():
+            table[code] = ord(" ")
+    return bytes(table)
+
+
+BYTE_TABLE = _build_byte_table()
+# Concepto de los textos sin ninguna palabra clave
+NO_CONCEPT = "Ninguno"
+# Separador de textos dentro del lote; va rodeado de espacios para que sea una palabra propia
+SEPARATOR = "\x00"
+_WORD = re.compile(r"\w+")
+# Combinaciones de palabras clave cuyo resultado se guarda
+MAX_CACHED_RESULTS = 4096
+
+
+def _token(keyword):
+    return keyword.replace("ñ", "\x01").encode("utf-8")
+
+
+def _trie_pattern(words):
+    # Factoriza los prefijos comunes para que el motor de regex descarte rápido cada posición
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    # Clasificador por palabra completa e insensible a tildes sobre todas las palabras clave: "educacion"
+    # coincide con "educación" y "paz" no coincide dentro de "capaz". Los textos se procesan por lotes sin
+    # recorrerlos con una expresión regular: se unen, se normalizan con un solo bytes.translate, se parten en
+    # palabras y se conservan (con map/compress, sin bucles de Python) solo las palabras clave y los
+    # separadores. Los textos con letras que la tabla no cubre y las palabras clave de varias palabras usan
+    # una expresión regular sobre el texto normalizado con fold()
+    def __init__(self, keywords_by_concept):
+        self.concepts = list(keywords_by_concept)
+        self._concepts_by_keyword = {}
+        for concept, keywords in keywords_by_concept.items():
+            for keyword in keywords:
+                self._concepts_by_keyword.setdefault(fold(keyword), []).append(concept)
+        self._regex = re.compile(r"\b" + _trie_pattern(self._concepts_by_keyword) + r"\b")
+        self._keywords_by_token = {_token(keyword): keyword for keyword in self._concepts_by_keyword}
+        self._wanted = frozenset(self._keywords_by_token) | {SEPARATOR.encode()}
+        # Con alguna palabra clave de varias palabras o con letras sin equivalente ASCII, todo pasa por la regex
+        self._token_lookup = all(_WORD.fullmatch(keyword) and _token(keyword).isascii() for keyword in self._concepts_by_keyword)
+        self._order = {keyword: index for index, keyword in enumerate(self._concepts_by_keyword)}
+        self._order_concepts = {concept: index for index, concept in enumerate(self.concepts)}
+        self._results = {}
+
+    def _regex_keywords(self, text):
+        return tuple(_token(keyword) for keyword in self._regex.findall(fold(text)))
+
+    def _find_keywords(self, texts):
+        # Por cada texto, sus palabras clave como tokens (ver _token): bytes separados por espacios o, desde la
+        # expresión regular, una tupla
+        if not self._token_lookup:
+            return [self._regex_keywords(text) for text in texts]
+        joined = f" {SEPARATOR} ".join(texts)
+        if joined.count(SEPARATOR) != max(len(texts) - 1, 0):
+            # Algún texto contiene el separador
+            joined = f" {SEPARATOR} ".join(text.replace(SEPARATOR, " ") for text in texts)
+        # En Latin-1 cada letra con tilde ocupa un byte (tras pasar a NFC, que no copia el texto si ya lo está);
+        # los caracteres fuera de Latin-1 (emojis, comillas tipográficas, otros alfabetos) se vuelven "?" y
+        # separan palabras
+        data = unicodedata.normalize("NFC", joined).encode("latin-1", "replace").translate(BYTE_TABLE)
+        words = data.split()
+        found = b" ".join(compress(words, map(self._wanted.__contains__, words))).split(SEPARATOR.encode())
+        if not data.isascii():
+            # Textos con letras sin equivalente ASCII (ß, æ, ø...): la regex decide los límites de palabra
+            for index, part in enumerate(data.split(SEPARATOR.encode())):
+                if not part.isascii():
+                    found[index] = self._regex_keywords(texts[index])
+        return found
+
+    def _result(self, found):
+        # {concepto: (palabras clave)} en el orden de los conceptos y de las palabras clave. Se calcula una vez
+        # por combinación de palabras clave, que se repiten mucho entre tweets
+        tokens = found.split() if isinstance(found, bytes) else found
+        keywords = sorted({self._keywords_by_token[token] for token in tokens}, key=self._order.__getitem__)
+        matches = {}
+        for keyword in keywords:
+            for concept in self._concepts_by_keyword[keyword]:
+                matches.setdefault(concept, []).append(keyword)
+        result = {concept: tuple(matches[concept]) for concept in sorted(matches, key=self._order_concepts.__getitem__)}
+        if len(self._results) < MAX_CACHED_RESULTS:
+            self._results[found] = result
+        return result
+
+    def _matches(self, texts):
+        # Resultados compartidos con la caché: quien los devuelve hace la copia
+        texts = list(texts)
+        if not texts:
+            return []
+        cached = self._results
+        return [cached[found] if found in cached else self._result(found) for found in self._find_keywords(texts)]
+
+    def match_keywords_many(self, texts):
+        # [{concepto: (palabras clave encontradas)}] para cada texto
+        return [dict(matches) for matches in self._matches(texts)]
+
+    def match_keywords(self, text):
+        return self.match_keywords_many([text])[0]
+
+    def match_many(self, texts):
+        return [list(matches) for matches in self._matches(texts)]
+
+    def match(self, text):
+        return list(self.match_keywords(text))
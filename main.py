@@ -2,12 +2,29 @@ import logging
 import tweepy
 import time
 import json
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
 import os
-from flask import Flask, request, jsonify, render_template
-from datetime import datetime
+import tempfile
+import threading
+import contextvars
+import math
+import pytz
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
 from dotenv import load_dotenv
+from sentiment_backends import bucket_by_length, load_backend
+from sentiment_cache import SentimentCache, cache_key
+from inference_server import InferenceClient
+from rate_limiter import RateLimitExceeded, RateLimitScheduler
+from tweet_store import ANALYTICS_COLUMNS, CONCEPT_SEPARATOR, EXPORT_COLUMNS, TweetStore
+from jobs import JobQueue
+from keyword_matcher import NO_CONCEPT, KeywordMatcher
+from report_cache import ReportCache
+import export
+import metrics
+import sentiment_trend
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -19,24 +36,145 @@ app = Flask(__name__)
 
 # Configuración de API de Twitter
 BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-if not BEARER_TOKEN:
-    logger.error("Falta el BEARER_TOKEN para Twitter")
-    exit(1)
-
-# Inicialización del cliente de Twitter
-try:
-    twitter_client = tweepy.Client(bearer_token=BEARER_TOKEN)
-except Exception as e:
-    logger.error(f"Error al inicializar cliente de Twitter: {e}")
-    exit(1)
-
-# Inicialización del modelo de sentimiento BETO
-try:
-    tokenizer = AutoTokenizer.from_pretrained("finiteautomata/beto-sentiment-analysis")
-    model = AutoModelForSequenceClassification.from_pretrained("finiteautomata/beto-sentiment-analysis")
-except Exception as e:
-    logger.error(f"Error al cargar modelo de sentimiento: {e}")
-    exit(1)
+
+# Número máximo de búsquedas simultáneas contra la API de Twitter
+TWITTER_MAX_CONCURRENCY = int(os.getenv("TWITTER_MAX_CONCURRENCY", "10"))
+
+# Cuota de search_recent_tweets compartida entre workers (por defecto 450 consultas cada 15 minutos).
+# Con la cuota agotada, una solicitud espera como máximo TWITTER_RATELIMIT_MAX_WAIT segundos y si no, falla con retry-after
+rate_limiter = RateLimitScheduler(
+    db_path=os.getenv("TWITTER_RATELIMIT_DB", os.path.join(tempfile.gettempdir(), "electionsapp_ratelimit.db")),
+    limit=int(os.getenv("TWITTER_RATE_LIMIT", "450")),
+    window=int(os.getenv("TWITTER_RATE_WINDOW", "900"))
+)
+TWITTER_RATELIMIT_MAX_WAIT = float(os.getenv("TWITTER_RATELIMIT_MAX_WAIT", "0"))
+# Un lote de varias ubicaciones puede superar la cuota de una ventana: espera la siguiente hasta este máximo
+BATCH_RATELIMIT_MAX_WAIT = float(os.getenv("BATCH_RATELIMIT_MAX_WAIT", os.getenv("TWITTER_RATE_WINDOW", "900")))
+BATCH_MAX_LOCATIONS = int(os.getenv("BATCH_MAX_LOCATIONS", "100"))
+# Un lote sin "async" no espera ventanas nuevas y debe terminar antes del timeout de gunicorn: con más
+# consultas que estas se pide usar "async"
+BATCH_SYNC_MAX_QUERIES = int(os.getenv("BATCH_SYNC_MAX_QUERIES", "200"))
+# Tweets por envío al modelo durante la descarga del lote: bastantes para llenar los lotes de
+# SENTIMENT_MAX_BATCH_SIZE agrupados por longitud, pocos para empezar a clasificar sin esperar a toda la tanda
+BATCH_SCORE_CHUNK = int(os.getenv("BATCH_SCORE_CHUNK", "512"))
+
+# Almacén incremental de tweets (SQLite). Con TWEET_STORE_DB vacío se vuelve a descargar todo en cada solicitud
+TWEET_STORE_DB = os.getenv("TWEET_STORE_DB", "tweets.db")
+tweet_store = TweetStore(TWEET_STORE_DB) if TWEET_STORE_DB else None
+TWEET_STORE_PAGE_SIZE = int(os.getenv("TWEET_STORE_PAGE_SIZE", "100"))
+TWEET_STORE_MAX_PAGES = int(os.getenv("TWEET_STORE_MAX_PAGES", "5"))
+TWEET_STORE_REPORT_DAYS = int(os.getenv("TWEET_STORE_REPORT_DAYS", "7"))
+TWEET_STORE_REPORT_LIMIT = int(os.getenv("TWEET_STORE_REPORT_LIMIT", "1000"))
+# Filas leídas de SQLite (y por grupo de filas en Parquet) en cada paso de una exportación
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+# Cola de análisis en segundo plano para POST /analyze con "async": true. Un trabajo se da por perdido si su
+# worker pasa JOB_TIMEOUT segundos sin renovarlo, no por su duración total (un lote grande puede esperar varias ventanas)
+job_queue = JobQueue(
+    db_path=os.getenv("JOBS_DB", os.path.join(tempfile.gettempdir(), "electionsapp_jobs.db")),
+    max_workers=int(os.getenv("ANALYZE_WORKERS", "2")),
+    timeout=int(os.getenv("JOB_TIMEOUT", "900"))
+)
+
+# Caché de análisis por (location, politician); REPORT_CACHE_TTL=0 la desactiva. Al vencer, el análisis
+# anterior se sigue sirviendo hasta REPORT_CACHE_STALE_TTL segundos más mientras se recalcula en segundo plano.
+# Los análisis incompletos (búsquedas fallidas o cortadas por la cuota) o vacíos vencen a los REPORT_CACHE_INCOMPLETE_TTL
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "600"))
+REPORT_CACHE_INCOMPLETE_TTL = int(os.getenv("REPORT_CACHE_INCOMPLETE_TTL", "60"))
+report_cache = ReportCache(
+    ttl=REPORT_CACHE_TTL,
+    max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "64")),
+    stale_ttl=int(os.getenv("REPORT_CACHE_STALE_TTL", "3600")),
+    ttl_for=lambda analysis: REPORT_CACHE_TTL if analysis.get("complete", True) else min(REPORT_CACHE_INCOMPLETE_TTL, REPORT_CACHE_TTL)
+) if REPORT_CACHE_TTL > 0 else None
+
+# Analítica columnar sobre el almacén de tweets (/analytics) y tendencia temporal del reporte
+ANALYTICS_TIMEZONE = os.getenv("ANALYTICS_TIMEZONE", "America/Bogota")
+REPORT_TIMEZONE = pytz.timezone(ANALYTICS_TIMEZONE)
+ANALYTICS_DAYS = int(os.getenv("ANALYTICS_DAYS", "30"))
+ANALYTICS_MAX_TWEETS = int(os.getenv("ANALYTICS_MAX_TWEETS", "500000"))
+# Los SentimentFrame se guardan por (location, politician, days): cambiar freq o refrescar el tablero no vuelve
+# a leer ni a armar cientos de miles de filas. ANALYTICS_CACHE_TTL=0 la desactiva
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+analytics_cache = ReportCache(
+    ttl=ANALYTICS_CACHE_TTL,
+    max_entries=int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "8")),
+    stale_ttl=int(os.getenv("ANALYTICS_CACHE_STALE_TTL", "300"))
+) if ANALYTICS_CACHE_TTL > 0 else None
+REPORT_TREND_FREQ = os.getenv("REPORT_TREND_FREQ", "D")
+
+# Con TWITTER_MERGED_QUERIES=1 se agrupan las palabras clave de varios conceptos en tan pocas consultas
+# como permita el límite de longitud de la API, y los conceptos se asignan localmente
+TWITTER_MERGED_QUERIES = os.getenv("TWITTER_MERGED_QUERIES", "0") == "1"
+TWITTER_MAX_QUERY_LENGTH = int(os.getenv("TWITTER_MAX_QUERY_LENGTH", "512"))
+
+# Tamaño máximo de cada lote enviado al modelo de sentimiento
+SENTIMENT_MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", "32"))
+
+# Caché de sentimientos: LRU en memoria y, si se define SENTIMENT_CACHE_DB, un nivel SQLite en disco
+sentiment_cache = SentimentCache(
+    max_entries=int(os.getenv("SENTIMENT_CACHE_SIZE", "50000")),
+    db_path=os.getenv("SENTIMENT_CACHE_DB") or None,
+    max_disk_entries=int(os.getenv("SENTIMENT_CACHE_DB_MAX_ENTRIES", "500000"))
+)
+
+# Modelo de sentimiento BETO (SENTIMENT_BACKEND: torch, torch-int8 u onnx)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+
+# Con SENTIMENT_WARMUP=1 el modelo se carga al importar el módulo; bajo gunicorn --preload
+# esto ocurre en el proceso maestro y los workers lo comparten por copy-on-write
+SENTIMENT_WARMUP = os.getenv("SENTIMENT_WARMUP", "0") == "1"
+
+# Si se define, la inferencia se delega al servidor compartido (python inference_server.py)
+# en lugar de cargar una copia del modelo en cada worker
+SENTIMENT_SERVER_SOCKET = os.getenv("SENTIMENT_SERVER_SOCKET")
+# Solicitudes simultáneas de un mismo worker al servidor (cada hilo usa su propia conexión), para que el
+# servidor pueda juntar los bloques de una solicitud grande en sus micro-lotes
+SENTIMENT_SERVER_CONCURRENCY = max(1, int(os.getenv("SENTIMENT_SERVER_CONCURRENCY", "4")))
+
+# Métricas por etapa en /metrics (METRICS_ENABLED=0 las desactiva); el desglose por solicitud se pide con "timings": true
+metrics.registry.enabled = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# El cliente de Twitter y el modelo se inicializan de forma perezosa en el primer uso
+twitter_client = None
+sentiment_backend = None
+_init_lock = threading.Lock()
+
+def _track_rate_limit(response, *args, **kwargs):
+    # Mantiene la cuota compartida al día con los encabezados x-rate-limit-* de cada respuesta
+    if "/tweets/search/recent" in response.url:
+        rate_limiter.update_from_headers(response.headers)
+
+def get_twitter_client():
+    global twitter_client
+    if twitter_client is None:
+        with _init_lock:
+            if twitter_client is None:
+                if not BEARER_TOKEN:
+                    raise RuntimeError("Falta el BEARER_TOKEN para Twitter")
+                twitter_client = tweepy.Client(bearer_token=BEARER_TOKEN)
+                twitter_client.session.hooks["response"].append(_track_rate_limit)
+    return twitter_client
+
+def get_sentiment_backend():
+    global sentiment_backend
+    if sentiment_backend is None:
+        with _init_lock:
+            if sentiment_backend is None and SENTIMENT_SERVER_SOCKET:
+                logger.info(f"Using sentiment inference server at {SENTIMENT_SERVER_SOCKET}")
+                sentiment_backend = InferenceClient(SENTIMENT_SERVER_SOCKET)
+            if sentiment_backend is None:
+                start = time.perf_counter()
+                backend_options = {"onnx_path": os.getenv("SENTIMENT_ONNX_PATH")} if SENTIMENT_BACKEND == "onnx" else {}
+                sentiment_backend = load_backend(SENTIMENT_BACKEND, **backend_options)
+                logger.info(f"Sentiment backend '{SENTIMENT_BACKEND}' loaded in {time.perf_counter() - start:.2f}s")
+    return sentiment_backend
+
+def warm_up():
+    # Carga los componentes pesados por adelantado (solo pesos, sin inferencia, para que sea seguro hacer fork)
+    get_sentiment_backend()
+    if BEARER_TOKEN:
+        get_twitter_client()
 
 # Conceptos clave del PND
 PND_CONCEPTS = [
@@ -59,6 +197,9 @@ PND_KEYWORDS = {
     "salud": ["salud", "hospitales", "clínicas", "pandemia", "vacunas"]
 }
 
+# Clasificador precompilado sobre todas las palabras clave (insensible a tildes, por palabra completa)
+keyword_matcher = KeywordMatcher(PND_KEYWORDS)
+
 # Plantillas para propuestas y discursos por concepto
 PND_TEMPLATES = {
     "seguridad": {
@@ -113,97 +254,370 @@ PND_TEMPLATES = {
     }
 }
 
-def search_with_retry(query, max_results=10, retries=3, backoff_factor=60):
+def search_with_retry(query, max_results=10, retries=3, reserved=False, max_wait=None, since_id=None, until_id=None, next_token=None):
+    # Los cupos se piden al planificador compartido; si la cuota se agota se falla con retry-after en vez de dormir a ciegas
+    max_wait = TWITTER_RATELIMIT_MAX_WAIT if max_wait is None else max_wait
     for attempt in range(retries):
+        if attempt > 0:
+            metrics.twitter_retries.inc()
+        if not reserved or attempt > 0:
+            with metrics.timed("rate_limit_wait"):
+                rate_limiter.acquire(1, max_wait)
         try:
-            return twitter_client.search_recent_tweets(
-                query=query,
-                max_results=max_results,
-                tweet_fields=["created_at", "author_id", "public_metrics", "geo", "in_reply_to_user_id", "context_annotations", "attachments"],
-                expansions=["author_id"],
-                user_fields=["username"]
-            )
-        except tweepy.TweepyException as e:
-            if "Rate limit" in str(e) and attempt < retries - 1:
-                wait_time = backoff_factor * (2 ** attempt)
-                logger.warning(f"Rate limit hit, waiting {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                raise e
+            with metrics.timed("twitter_search"):
+                response = get_twitter_client().search_recent_tweets(
+                    query=query,
+                    max_results=max_results,
+                    since_id=since_id,
+                    until_id=until_id,
+                    next_token=next_token,
+                    tweet_fields=["created_at", "author_id", "public_metrics", "geo", "in_reply_to_user_id", "context_annotations", "attachments"],
+                    expansions=["author_id"],
+                    user_fields=["username"]
+                )
+            metrics.twitter_api_calls.inc(outcome="ok")
+            return response
+        except tweepy.TooManyRequests as e:
+            metrics.twitter_api_calls.inc(outcome="rate_limited")
+            retry_after = rate_limiter.mark_exhausted(e.response.headers.get("x-rate-limit-reset"))
+            logger.warning(f"Rate limit hit, quota resets in {retry_after:.0f} seconds")
+            if attempt == retries - 1:
+                raise RateLimitExceeded(retry_after)
+        except Exception:
+            metrics.twitter_api_calls.inc(outcome="error")
+            raise
     raise Exception("Max retries exceeded for Twitter API")
 
+def predict_sentiments(texts):
+    with metrics.timed("sentiment_inference"):
+        predictions = get_sentiment_backend().predict(texts)
+    metrics.sentiment_batch_size.observe(len(texts))
+    metrics.tweets_scored.inc(len(texts))
+    return predictions
+
 def analyze_sentiment_batch(texts):
     if not texts:
         return []
     try:
-        inputs = tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=512)
-        with torch.no_grad():
-            outputs = model(**inputs)
-        probabilities = torch.nn.functional.softmax(outputs.logits, dim=-1)
-        return [{0: "negativo", 1: "neutral", 2: "positivo"}[torch.argmax(prob, dim=-1).item()] for prob in probabilities]
+        return predict_sentiments(texts)
     except Exception as e:
         logger.error(f"Error in sentiment analysis: {e}")
         return ["neutral"] * len(texts)
 
-def search_and_summarize_tweets(location, politician=None):
-    if not location or location.lower() == "none":
-        location = "Bogotá"  # Default location to avoid None
-    tweet_texts = []
-    summary_lines = []
-
-    for concept, keywords in PND_KEYWORDS.items():
-        query = f'"{location}" ({" OR ".join(keywords)})'
-        if politician:
-            query += f' {politician} OR @{politician.lstrip("@")}'
-        query += ' lang:es -is:retweet'
+def predict_sentiments_bucketed(texts, max_batch_size=None):
+    # Devuelve None en las posiciones cuyo lote falló, para que no se guarden en caché
+    if not texts:
+        return []
+    max_batch_size = max(1, max_batch_size or SENTIMENT_MAX_BATCH_SIZE)
+    if getattr(get_sentiment_backend(), "batches_remotely", False):
+        # El servidor agrupa por longitud y forma los micro-lotes por su cuenta; se envían solicitudes de
+        # max_batch_size textos para no bloquear la cola del servidor ni agotar el timeout del socket, varias a
+        # la vez (InferenceClient abre una conexión por hilo)
+        sentiments = [None] * len(texts)
+        starts = range(0, len(texts), max_batch_size)
+        with ThreadPoolExecutor(max_workers=min(SENTIMENT_SERVER_CONCURRENCY, len(starts)), thread_name_prefix="sentiment-remote") as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, predict_sentiments, texts[start:start + max_batch_size]): start
+                for start in starts
+            }
+            for future in as_completed(futures):
+                start = futures[future]
+                try:
+                    sentiments[start:start + max_batch_size] = future.result()
+                except Exception as e:
+                    logger.error(f"Error in sentiment analysis: {e}")
+        return sentiments
+
+    try:
+        with metrics.timed("sentiment_tokenize"):
+            lengths = get_sentiment_backend().token_lengths(texts)
+    except Exception as e:
+        logger.error(f"Error tokenizing texts for bucketing: {e}")
+        lengths = [len(text) for text in texts]
+
+    sentiments = [None] * len(texts)
+    for bucket in bucket_by_length(lengths, max_batch_size):
         try:
-            response = search_with_retry(query=query, max_results=10)
-            if not response.data:
-                logger.info(f"No tweets found for query: {query}")
-                continue
-
-            users = {user.id: user.username for user in response.includes.get('users', [])}
-            texts = [tweet.text for tweet in response.data]
-            sentiments = analyze_sentiment_batch(texts)
-
-            for tweet, sentiment in zip(response.data, sentiments):
-                username = users.get(tweet.author_id, "unknown")
-                tweet_url = f"https://twitter.com/{username}/status/{tweet.id}"
-                tweet_texts.append({
-                    "text": tweet.text,
-                    "concept": concept,
-                    "sentiment": sentiment
-                })
-                summary = (
-                    f"👤 @{username}\n"
-                    f"🗓️ {tweet.created_at}\n"
-                    f"😊 Sentimiento: {sentiment}\n"
-                    f"❤️ {tweet.public_metrics['like_count']} | 🔁 {tweet.public_metrics['retweet_count']}\n"
-                    f"🔗 {tweet_url}\n"
-                    f"📝 {tweet.text}\n"
-                    f"🏷️ Concepto PND: {concept}"
-                )
-                if tweet.in_reply_to_user_id:
-                    summary += f"\n↩️ Reply to user ID: {tweet.in_reply_to_user_id}"
-                if tweet.geo:
-                    summary += f"\n🌍 Geo: {tweet.geo}"
-                if tweet.attachments:
-                    summary += f"\n📎 Attachments: {tweet.attachments}"
-                if tweet.context_annotations:
-                    summary += "\n🏷️ Context: " + ", ".join([ca['entity']['name'] for ca in tweet.context_annotations if 'entity' in ca])
-                summary_lines.append(summary + "\n\n")
-
-            logger.info(f"Found {len(response.data)} tweets for query: {query}")
+            predictions = predict_sentiments([texts[i] for i in bucket])
         except Exception as e:
-            logger.error(f"Error fetching tweets for {concept}: {e}")
+            logger.error(f"Error in sentiment analysis: {e}")
+            continue
+        for i, sentiment in zip(bucket, predictions):
+            sentiments[i] = sentiment
+    return sentiments
+
+def analyze_sentiment_bucketed(texts, max_batch_size=None):
+    return [sentiment or "neutral" for sentiment in predict_sentiments_bucketed(texts, max_batch_size)]
+
+def analyze_sentiments_cached(records, max_batch_size=None, fallback="neutral"):
+    # Solo los fallos de caché llegan al modelo
+    keys = [cache_key(record["id"], record["text"]) for record in records]
+    sentiments = sentiment_cache.get_many(keys)
+    misses = {}
+    for key, record in zip(keys, records):
+        if key not in sentiments:
+            misses.setdefault(key, record["text"])
+
+    if misses:
+        get_sentiment_backend()  # los errores de carga del modelo se propagan al job
+    predicted = {}
+    for key, sentiment in zip(misses, predict_sentiments_bucketed(list(misses.values()), max_batch_size)):
+        if sentiment is not None:
+            predicted[key] = sentiment
+    sentiment_cache.set_many(predicted)
+    sentiments.update(predicted)
+
+    logger.info(f"Sentiment cache: {len(keys) - len(misses)} hits, {len(misses)} misses")
+    metrics.sentiment_cache_lookups.inc(len(keys) - len(misses), result="hit")
+    metrics.sentiment_cache_lookups.inc(len(misses), result="miss")
+    return [sentiments.get(key, fallback) for key in keys]
+
+def build_concept_query(location, keywords, politician=None):
+    query = f'"{location}" ({" OR ".join(keywords)})'
+    if politician:
+        query += f' {politician} OR @{politician.lstrip("@")}'
+    query += ' lang:es -is:retweet'
+    return query
+
+# Separador de conceptos en la etiqueta de una consulta combinada, p. ej. "seguridad + alimentacion"
+QUERY_LABEL_SEPARATOR = " + "
+
+def build_queries(location, politician=None, merged=None):
+    # Devuelve [(etiqueta, consulta)]; la etiqueta identifica la consulta en el almacén de tweets
+    merged = TWITTER_MERGED_QUERIES if merged is None else merged
+    if not merged:
+        return [(concept, build_concept_query(location, PND_KEYWORDS[concept], politician)) for concept in PND_CONCEPTS]
+
+    queries, group = [], []
+    for concept in PND_CONCEPTS:
+        candidate = group + [concept]
+        keywords = [keyword for c in candidate for keyword in PND_KEYWORDS[c]]
+        if group and len(build_concept_query(location, keywords, politician)) > TWITTER_MAX_QUERY_LENGTH:
+            queries.append(group)
+            candidate = [concept]
+        group = candidate
+    queries.append(group)
+    return [
+        (QUERY_LABEL_SEPARATOR.join(group), build_concept_query(location, [k for c in group for k in PND_KEYWORDS[c]], politician))
+        for group in queries
+    ]
+
+def query_concepts(label):
+    return label.split(QUERY_LABEL_SEPARATOR)
+
+def fetch_concept_pages(location, label, query, politician=None):
+    # Con almacén, solo se piden los tweets posteriores al último visto (since_id), paginando hasta TWEET_STORE_MAX_PAGES.
+    # Si la paginación anterior se cortó, se sigue desde el tweet más antiguo descargado (until_id) hasta cerrar el hueco.
+    # Devuelve (páginas, completo); completo es False si la cuota o el límite de páginas cortó la paginación
+    since_id = tweet_store.get_since_id(location, label, politician) if tweet_store else None
+    until_id = tweet_store.get_until_id(location, label, politician) if since_id else None
+    max_results = TWEET_STORE_PAGE_SIZE if tweet_store else min(100, 10 * len(query_concepts(label)))
+    pages, next_token, reserved = [], None, True
+    while True:
+        try:
+            response = search_with_retry(query=query, max_results=max_results, reserved=reserved,
+                                         since_id=since_id, until_id=until_id, next_token=next_token)
+        except tweepy.BadRequest as e:
+            if not since_id or pages:
+                raise
+            # since_id inválido (p. ej. fuera de los 7 días de la búsqueda reciente): se repite sin cursor
+            logger.warning(f"since_id {since_id} rejected for {label} ({location}), retrying without it: {e}")
+            since_id, until_id, reserved = None, None, False
             continue
+        except RateLimitExceeded as e:
+            if not pages:
+                raise
+            # Sin cupo para más páginas: se guardan las ya descargadas, sin avanzar el cursor
+            logger.warning(f"Stopping pagination for {label} ({location}) after {len(pages)} pages: {e}")
+            return pages, False
+        pages.append(response)
+        reserved = False
+        next_token = (response.meta or {}).get("next_token")
+        if not since_id or not next_token:
+            return pages, True
+        if len(pages) >= TWEET_STORE_MAX_PAGES:
+            logger.info(f"Stopping pagination for {label} ({location}) at {len(pages)} pages, more tweets pending")
+            return pages, False
 
-    if not tweet_texts:
-        return [], "No tweets found for any PND concept in the given location."
+def iter_query_responses(items, max_workers=None):
+    # items: [(location, politician, label, query)] con los cupos ya reservados. Lanza todas las búsquedas
+    # a la vez y entrega cada resultado (item + páginas + completo) en cuanto termina; una consulta fallida
+    # llega con páginas None. Si alguna consulta agotó la cuota, se entregan las demás (para guardarlas) y al
+    # final se lanza RateLimitExceeded con la mayor espera
+    max_workers = max(1, min(max_workers or TWITTER_MAX_CONCURRENCY, len(items)))
+    rate_limited = []
 
-    return tweet_texts, "\n".join(summary_lines)
+    def fetch(item):
+        location, politician, label, query = item
+        try:
+            return (*item, *fetch_concept_pages(location, label, query, politician))
+        except RateLimitExceeded as e:
+            logger.warning(f"Rate limited fetching tweets for {label} ({location}): {e}")
+            rate_limited.append(e)
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching tweets for {label} ({location}): {e}")
+            return (*item, None, False)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Cada hilo hereda el contexto de la solicitud para que sus tiempos entren en el desglose
+        for future in as_completed([executor.submit(contextvars.copy_context().run, fetch, item) for item in items]):
+            result = future.result()
+            if result is not None:
+                yield result
+    if rate_limited:
+        raise max(rate_limited, key=lambda e: e.retry_after)
+
+def iter_concept_responses(location, politician=None, max_workers=None, queries=None):
+    get_twitter_client()  # falla de inmediato si falta la configuración de Twitter
+    queries = queries or build_queries(location, politician)
+    with metrics.timed("rate_limit_wait"):
+        rate_limiter.acquire(len(queries), TWITTER_RATELIMIT_MAX_WAIT)
+    items = [(location, politician, label, query) for label, query in queries]
+    for _, _, label, query, pages, complete in iter_query_responses(items, max_workers):
+        yield label, query, pages, complete
+
+@metrics.instrument("twitter_fetch")
+def fetch_concept_responses(location, politician=None, max_workers=None):
+    # Mismos resultados que iter_concept_responses, en el orden de las consultas
+    queries = build_queries(location, politician)
+    results = {result[0]: result for result in iter_concept_responses(location, politician, max_workers, queries)}
+    return [results[label] for label, _ in queries]
+
+def tweet_to_record(tweet, users, concept):
+    return {
+        "id": tweet.id,
+        "text": tweet.text,
+        "concept": concept,
+        "username": users.get(tweet.author_id, "unknown"),
+        "author_id": tweet.author_id,
+        "created_at": tweet.created_at,
+        "public_metrics": tweet.public_metrics or {},
+        "in_reply_to_user_id": tweet.in_reply_to_user_id,
+        "geo": tweet.geo,
+        "attachments": tweet.attachments,
+        "context_annotations": tweet.context_annotations,
+    }
+
+def format_tweet_summary(record, sentiment):
+    tweet_url = f"https://twitter.com/{record['username']}/status/{record['id']}"
+    summary = (
+        f"👤 @{record['username']}\n"
+        f"🗓️ {record['created_at']}\n"
+        f"😊 Sentimiento: {sentiment}\n"
+        f"❤️ {record['public_metrics'].get('like_count', 0)} | 🔁 {record['public_metrics'].get('retweet_count', 0)}\n"
+        f"🔗 {tweet_url}\n"
+        f"📝 {record['text']}\n"
+        f"🏷️ Concepto PND: {record['concept']}"
+    )
+    if record["in_reply_to_user_id"]:
+        summary += f"\n↩️ Reply to user ID: {record['in_reply_to_user_id']}"
+    if record["geo"]:
+        summary += f"\n🌍 Geo: {record['geo']}"
+    if record["attachments"]:
+        summary += f"\n📎 Attachments: {record['attachments']}"
+    if record["context_annotations"]:
+        summary += "\n🏷️ Context: " + ", ".join([ca['entity']['name'] for ca in record["context_annotations"] if 'entity' in ca])
+    return summary + "\n\n"
+
+def pages_to_records(location, concept, query, pages, politician=None, complete=True):
+    records = []
+    try:
+        for response in pages:
+            users = {user.id: user.username for user in (response.includes or {}).get('users', [])}
+            records.extend(tweet_to_record(tweet, users, concept) for tweet in response.data or [])
+        metrics.tweets_fetched.inc(len(records))
+        # Los conceptos se asignan una sola vez al descargar y quedan guardados para la analítica
+        for record, concepts in zip(records, keyword_matcher.match_many([record["text"] for record in records])):
+            record["concepts"] = concepts or [NO_CONCEPT]
+        if tweet_store:
+            tweet_store.save(location, concept, politician, records, complete)
+        if not records:
+            logger.info(f"No new tweets found for query: {query}")
+            return []
+        logger.info(f"Found {len(records)} tweets for query: {query}")
+    except Exception as e:
+        logger.error(f"Error processing tweets for {concept}: {e}")
+    return records
+
+def load_report_records(location, politician=None, concept=None, limit=None):
+    # El reporte cubre todo lo almacenado en la ventana, no solo lo descargado en esta solicitud
+    since = datetime.now(timezone.utc) - timedelta(days=TWEET_STORE_REPORT_DAYS)
+    return tweet_store.load(location, politician, since=since, limit=limit or TWEET_STORE_REPORT_LIMIT, concept=concept)
+
+def score_records(records):
+    # Lo ya almacenado con sentimiento no se vuelve a inferir
+    pending = [i for i, record in enumerate(records) if not record.get("sentiment")]
+    for i, sentiment in zip(pending, analyze_sentiments_cached([records[i] for i in pending], fallback=None)):
+        records[i]["sentiment"] = sentiment
+    if tweet_store:
+        tweet_store.set_sentiments({records[i]["id"]: records[i]["sentiment"] for i in pending if records[i]["sentiment"]})
+    return [record["sentiment"] or "neutral" for record in records]
+
+def dedupe_records(records, seen=None):
+    # Un tweet devuelto por varias consultas se analiza y se cuenta una sola vez
+    seen = set() if seen is None else seen
+    unique = []
+    for record in records:
+        if record["id"] not in seen:
+            seen.add(record["id"])
+            unique.append(record)
+    return unique
+
+def records_to_tweet_texts(records, sentiments):
+    return [
+        {
+            "id": record["id"], "text": record["text"], "concept": record["concept"], "sentiment": sentiment,
+            "created_at": record["created_at"], "public_metrics": record["public_metrics"]
+        }
+        for record, sentiment in zip(records, sentiments)
+    ]
+
+def search_and_summarize_tweets(location, politician=None, max_workers=None):
+    # Devuelve (tweets con sentimiento, resumen, completo); completo es False si alguna búsqueda falló o quedó cortada
+    if not location or location.lower() == "none":
+        location = "Bogotá"  # Default location to avoid None
+
+    # Primero se recopilan los tweets de todos los conceptos. Cada resultado se guarda en cuanto llega: si
+    # alguna consulta agotó la cuota, iter_concept_responses lanza RateLimitExceeded al final y lo ya
+    # descargado queda almacenado antes de responder 429
+    queries = build_queries(location, politician)
+    records_by_label, complete = {}, True
+    for label, query, pages, query_complete in iter_concept_responses(location, politician, max_workers, queries):
+        complete = complete and query_complete
+        if pages is not None:
+            records_by_label[label] = pages_to_records(location, label, query, pages, politician, query_complete)
+    records = [record for label, _ in queries for record in records_by_label.get(label, [])]
+    if tweet_store:
+        records = load_report_records(location, politician)
+    records = dedupe_records(records)
 
-def classify_tweets(tweets):
+    if not records:
+        return [], "No tweets found for any PND concept in the given location.", complete
+
+    # ...y luego se clasifican en una sola pasada del modelo
+    sentiments = score_records(records)
+    summary_lines = [format_tweet_summary(record, sentiment) for record, sentiment in zip(records, sentiments)]
+    return records_to_tweet_texts(records, sentiments), "\n".join(summary_lines), complete
+
+def iter_concept_tweets(location, politician=None, max_workers=None):
+    # Variante incremental para streaming: entrega (conceptos de la consulta, tweets nuevos con sentimiento,
+    # búsqueda completa) a medida que termina cada búsqueda. Con almacén, cada consulta carga solo su parte de
+    # TWEET_STORE_REPORT_LIMIT, para que el total no supere al de /analyze
+    if not location or location.lower() == "none":
+        location = "Bogotá"
+    queries = build_queries(location, politician)
+    share = -(-TWEET_STORE_REPORT_LIMIT // len(queries))
+    seen = set()
+    for label, query, pages, complete in iter_concept_responses(location, politician, max_workers, queries):
+        records = pages_to_records(location, label, query, pages, politician, complete) if pages is not None else []
+        if tweet_store:
+            records = load_report_records(location, politician, concept=label, limit=share)
+        records = dedupe_records(records, seen)
+        yield query_concepts(label), records_to_tweet_texts(records, score_records(records)), complete
+
+@metrics.instrument("classify")
+def classify_tweets(tweets, matches=None):
     classified = {concept: {"tweets": [], "sentiments": {"positivo": 0, "negativo": 0, "neutral": 0}} for concept in PND_CONCEPTS}
     classified["Ninguno"] = {"tweets": [], "sentiments": {"positivo": 0, "negativo": 0, "neutral": 0}}
 
@@ -211,25 +625,28 @@ def classify_tweets(tweets):
         logger.info("No tweets to classify")
         return classified
 
-    for tweet in tweets:
-        if not isinstance(tweet, dict) or "concept" not in tweet or "text" not in tweet:
+    if matches is None:
+        matches = keyword_matcher.match_keywords_many([tweet["text"] if isinstance(tweet, dict) and "text" in tweet else "" for tweet in tweets])
+    for index, tweet in enumerate(tweets):
+        if not isinstance(tweet, dict) or "text" not in tweet:
             logger.warning(f"Invalid tweet format: {tweet}")
             continue
-        concept = tweet["concept"]
         tweet_text = tweet["text"]
-        tweet_lower = tweet_text.lower()
         sentiment = tweet["sentiment"]
-        explanation = f"Identificado en búsqueda específica para {concept}: {', '.join(PND_KEYWORDS[concept])}"
 
-        if any(keyword in tweet_lower for keyword in PND_KEYWORDS[concept]):
+        # Un tweet se asigna a todos los conceptos cuyas palabras clave contiene
+        tweet_matches = matches[index]
+        for concept, keywords in tweet_matches.items():
             classified[concept]["tweets"].append({
+                "id": tweet.get("id"),
                 "text": tweet_text,
-                "explanation": explanation,
+                "explanation": f"Contiene palabras clave de {concept}: {', '.join(keywords)}",
                 "sentiment": sentiment
             })
             classified[concept]["sentiments"][sentiment] += 1
-        else:
+        if not tweet_matches:
             classified["Ninguno"]["tweets"].append({
+                "id": tweet.get("id"),
                 "text": tweet_text,
                 "explanation": "No contiene palabras clave específicas, pero fue capturado en la búsqueda.",
                 "sentiment": sentiment
@@ -301,11 +718,51 @@ def get_chart_data(classified_tweets):
         ]
     }
 
+def tweet_time(tweet):
+    # Fecha del tweet en la zona horaria del reporte, o None si no tiene una válida
+    created_at = tweet.get("created_at")
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.astimezone(REPORT_TIMEZONE)
+
+def get_trend_data(tweets, freq="D"):
+    # Serie por hora ("H") o por día ("D") de los tweets del reporte; con los pocos cientos de tweets de una
+    # solicitud se agrega en Python puro, sin cargar pandas
+    hourly = freq.upper().startswith("H")
+    counts, weights = {}, {}
+    for tweet in tweets:
+        local = tweet_time(tweet)
+        if local is None:
+            continue
+        bucket = sentiment_trend.bucket_start(math.floor(local.timestamp()), int(local.utcoffset().total_seconds()), hourly)
+        sentiment = tweet.get("sentiment") or "neutral"
+        public_metrics = tweet.get("public_metrics") or {}
+        weight = sentiment_trend.engagement_weight(sum(public_metrics.get(key) or 0 for key in ("like_count", "retweet_count", "reply_count", "quote_count")))
+        counts.setdefault(bucket, Counter())[sentiment] += 1
+        weights.setdefault(bucket, Counter())[sentiment] += weight
+    return sentiment_trend.trend_series(counts, weights, freq, REPORT_TIMEZONE)
+
+def unique_sentiment_counts(classified):
+    # Un tweet puede pertenecer a varios conceptos; los totales cuentan cada tweet una sola vez.
+    # Devuelve (tweets únicos, Counter por sentimiento)
+    unique_sentiments = {}
+    for concept in PND_CONCEPTS:
+        for tweet in classified.get(concept, {}).get("tweets", []):
+            unique_sentiments.setdefault(tweet.get("id") or tweet["text"], tweet["sentiment"])
+    return len(unique_sentiments), Counter(unique_sentiments.values())
+
 def generate_resumen_ejecutivo(classified, location):
-    total_tweets = sum(sum(c["sentiments"].values()) for c in classified.values() if c != classified.get("Ninguno", {}))
-    neg_porcent = sum(c["sentiments"]["negativo"] for c in classified.values()) / total_tweets * 100 if total_tweets else 0
-    pos_porcent = sum(c["sentiments"]["positivo"] for c in classified.values()) / total_tweets * 100 if total_tweets else 0
-    neu_porcent = sum(c["sentiments"]["neutral"] for c in classified.values()) / total_tweets * 100 if total_tweets else 0
+    total_tweets, sentiment_counts = unique_sentiment_counts(classified)
+    neg_porcent = sentiment_counts["negativo"] / total_tweets * 100 if total_tweets else 0
+    pos_porcent = sentiment_counts["positivo"] / total_tweets * 100 if total_tweets else 0
+    neu_porcent = sentiment_counts["neutral"] / total_tweets * 100 if total_tweets else 0
 
     max_neg_concept = max(
         [(c, classified[c]["sentiments"]["negativo"] / sum(classified[c]["sentiments"].values()) * 100)
@@ -324,29 +781,29 @@ def generate_resumen_ejecutivo(classified, location):
 <p><strong>Contexto</strong>: Los tweets reflejan eventos actuales, con menciones frecuentes a figuras locales.</p>
 <p>Este panorama sugiere que los electores buscan acciones concretas en {location}.</p>"""
 
+def analisis_concepto_lines(concept, data):
+    tweets = data.get("tweets", [])
+    if not tweets:
+        return []
+    sentiments = data.get("sentiments", {"positivo": 0, "negativo": 0, "neutral": 0})
+    lines = [f"{concept} ({len(tweets)} tweets, Sentimientos: Positivo {sentiments['positivo']}, Negativo {sentiments['negativo']}, Neutral {sentiments['neutral']}):"]
+    lines.extend(f"  - \"{tweet['text']}\" ({tweet['sentiment'].capitalize()})" for tweet in tweets)
+    return lines
+
 def generate_analisis_datos(classified):
-    output = ""
-    for concept in PND_CONCEPTS:
-        data = classified.get(concept, {})
-        tweets = data.get("tweets", [])
-        if not tweets:
-            continue
-        sentiments = data.get("sentiments", {"positivo": 0, "negativo": 0, "neutral": 0})
-        output += f"{concept} ({len(tweets)} tweets, Sentimientos: Positivo {sentiments['positivo']}, Negativo {sentiments['negativo']}, Neutral {sentiments['neutral']}):\n"
-        for tweet in tweets:
-            output += f"  - \"{tweet['text']}\" ({tweet['sentiment'].capitalize()})\n"
-    return output.strip() if output else "No data available for analysis."
+    lines = [line for concept in PND_CONCEPTS for line in analisis_concepto_lines(concept, classified.get(concept, {}))]
+    return "\n".join(lines).strip() if lines else "No data available for analysis."
 
 def generate_plan_estrategico(plan_conceptos, classified):
     logger.info("Generating plan estratégico with plan_conceptos: %s", plan_conceptos)
-    output = ""
+    lines = []
     for concepto in plan_conceptos:
         concept_key = concepto['concepto']
         sentiments = classified.get(concept_key, {}).get("sentiments", {"positivo": 0, "negativo": 0, "neutral": 0})
         total = sum(sentiments.values())
         neg_porcent = (sentiments["negativo"] / total * 100) if total > 0 else 0
-        output += f"{concepto['concepto']}: Necesidad: {concepto['necesidad']} ({neg_porcent:.1f}% negativo). Propuesta: {concepto['propuesta']}. Impacto: {concepto['impacto']}\n"
-    return output.strip() if output else "No data available for strategic planning."
+        lines.append(f"{concepto['concepto']}: Necesidad: {concepto['necesidad']} ({neg_porcent:.1f}% negativo). Propuesta: {concepto['propuesta']}. Impacto: {concepto['impacto']}")
+    return "\n".join(lines).strip() if lines else "No data available for strategic planning."
 
 def generate_discurso(plan_conceptos, location="Bogotá", candidate_name="[Nombre del Candidato]"):
     discourse = f"Queridos ciudadanos de {location}, soy {candidate_name}, un abogado de Bogotá con pasión por la ganadería y el arte, y un enfoque ligero pero comprometido en la política.\n\n"
@@ -393,35 +850,333 @@ def generate_grafico_visuales(chart_data, location="Bogotá"):
         }
     }
 
-def generate_structured_report(classified, chart_data, plan_conceptos, candidate_name="[Nombre del Candidato]", location="Bogotá"):
+def generate_trend_chart(trend, location="Bogotá"):
+    # Evolución de los sentimientos en el tiempo (conteos) y balance neto ponderado por interacción
+    period = "hora" if trend["freq"].upper().startswith("H") else "día"
+    return {
+        "type": "line",
+        "data": {
+            "labels": trend["labels"],
+            "datasets": [
+                {"label": "Positivo", "data": trend["positivo"], "borderColor": "#36A2EB", "backgroundColor": "#36A2EB", "yAxisID": "y"},
+                {"label": "Negativo", "data": trend["negativo"], "borderColor": "#FF6384", "backgroundColor": "#FF6384", "yAxisID": "y"},
+                {"label": "Neutral", "data": trend["neutral"], "borderColor": "#FFCE56", "backgroundColor": "#FFCE56", "yAxisID": "y"},
+                {"label": "Balance ponderado", "data": trend["weighted_net"], "borderColor": "#4BC0C0", "borderDash": [5, 5], "yAxisID": "y1"}
+            ]
+        },
+        "options": {
+            "scales": {
+                "x": {"title": {"display": True, "text": f"Tweets por {period}"}},
+                "y": {"title": {"display": True, "text": "Conteo de Tweets"}, "beginAtZero": True},
+                "y1": {"position": "right", "min": -1, "max": 1, "grid": {"drawOnChartArea": False},
+                       "title": {"display": True, "text": "Balance (positivo - negativo)"}}
+            },
+            "plugins": {"title": {"display": True, "text": f"Tendencia de Sentimientos en {location}"}}
+        }
+    }
+
+@metrics.instrument("report_sections")
+def generate_report_sections(classified, chart_data, plan_conceptos, location="Bogotá", trend=None):
+    # Secciones del reporte que no dependen del candidato
+    grafico = generate_grafico_visuales(chart_data, location)
+    return {
+        "resumen": generate_resumen_ejecutivo(classified, location),
+        "analisis": generate_analisis_datos(classified),
+        "plan": generate_plan_estrategico(plan_conceptos, classified),
+        "grafico": grafico["text"],
+        "chart_config": grafico["chart_config"],
+        "trend_chart_config": generate_trend_chart(trend, location) if trend and trend["labels"] else None
+    }
+
+@metrics.instrument("report")
+def generate_structured_report(classified, chart_data, plan_conceptos, candidate_name="[Nombre del Candidato]", location="Bogotá", sections=None):
     logger.info("Generating structured report with plan_conceptos: %s", plan_conceptos)
-    resumen = generate_resumen_ejecutivo(classified, location)
-    analisis = generate_analisis_datos(classified)
-    plan = generate_plan_estrategico(plan_conceptos, classified)
+    sections = sections or generate_report_sections(classified, chart_data, plan_conceptos, location)
     discurso = generate_discurso(plan_conceptos, location, candidate_name)
-    grafico = generate_grafico_visuales(chart_data, location)
 
     return {
-        "resumen": resumen,
-        "analisis": analisis,
-        "plan": plan,
+        "resumen": sections["resumen"],
+        "analisis": sections["analisis"],
+        "plan": sections["plan"],
         "discurso": discurso,
-        "grafico": grafico["text"],
-        "chart_config": grafico["chart_config"]
+        "grafico": sections["grafico"],
+        "chart_config": sections["chart_config"],
+        "trend_chart_config": sections.get("trend_chart_config")
+    }
+
+def build_analysis(tweet_texts, location, complete=True):
+    # Con los tweets de una sola solicitud, los conteos y la tendencia se calculan sobre diccionarios; la tabla
+    # columnar (analytics) queda para /analytics sobre todo el almacén
+    matches = keyword_matcher.match_keywords_many([tweet["text"] for tweet in tweet_texts])
+    classified = classify_tweets(tweet_texts, matches)
+    plan = generate_plan_and_discourse(classified, location)
+    return {
+        "classified": classified,
+        "plan": plan,
+        "chart_data": get_chart_data(classified),
+        "trend": get_trend_data(tweet_texts, REPORT_TREND_FREQ),
+        # Un análisis incompleto o vacío se guarda en caché por poco tiempo (REPORT_CACHE_INCOMPLETE_TTL)
+        "complete": complete and bool(tweet_texts)
+    }
+
+def with_report_sections(analysis, location):
+    # Guarda junto al análisis las secciones que no dependen del candidato, para no regenerarlas en cada reporte
+    analysis["sections"] = generate_report_sections(analysis["classified"], analysis["chart_data"], analysis["plan"]["conceptos"],
+                                                    location, analysis.get("trend"))
+    return analysis
+
+def analyze_location(location="Bogotá", politician=None):
+    # Parte costosa del reporte (búsqueda, sentimiento y clasificación); no depende del candidato
+    tweet_texts, _, complete = search_and_summarize_tweets(location, politician)
+    return with_report_sections(build_analysis(tweet_texts, location, complete), location)
+
+def report_cache_key(location, politician=None):
+    return f"{location}|{politician or ''}"
+
+def cached_analysis(location="Bogotá", politician=None):
+    if report_cache is None:
+        return analyze_location(location, politician)
+    analysis, cache_state = report_cache.get(report_cache_key(location, politician), lambda: analyze_location(location, politician))
+    metrics.report_cache_lookups.inc(result=cache_state)
+    logger.info(f"Report cache {cache_state} for {report_cache_key(location, politician)}")
+    return analysis
+
+def peek_cached_analysis(location="Bogotá", politician=None):
+    # Devuelve (análisis, estado de la caché: hit o stale) sin calcular; (None, "miss") si no hay nada en caché
+    if report_cache is None:
+        return None, "disabled"
+    analysis, cache_state = report_cache.peek(report_cache_key(location, politician), lambda: analyze_location(location, politician))
+    if analysis is not None:
+        metrics.report_cache_lookups.inc(result=cache_state)
+    return analysis, cache_state
+
+def render_report(analysis, location="Bogotá", candidate_name="[Nombre del Candidato]"):
+    # Con las secciones ya generadas, un candidato nuevo solo requiere volver a generar el discurso
+    report = generate_structured_report(analysis["classified"], analysis["chart_data"], analysis["plan"]["conceptos"],
+                                        candidate_name, location, sections=analysis.get("sections"))
+    return report, analysis["chart_data"]
+
+def batch_targets(data):
+    # Acepta {"locations": [...], "politician": ..., "candidate_name": ...} o una lista "targets" con un
+    # diccionario por ubicación; los valores de cada target tienen prioridad sobre los generales
+    targets = data.get("targets") or [{"location": location} for location in data.get("locations") or []]
+    normalized = []
+    for target in targets:
+        if isinstance(target, str):
+            target = {"location": target}
+        location = target.get("location") or "Bogotá"
+        normalized.append({
+            "location": location,
+            "politician": target.get("politician") or data.get("politician") or None,
+            "candidate_name": target.get("candidate_name") or data.get("candidate_name") or "[Nombre del Candidato]",
+        })
+    return list({report_cache_key(t["location"], t["politician"]): t for t in normalized}.values())
+
+def batch_query_items(targets):
+    return [
+        (target["location"], target["politician"], label, query)
+        for target in targets
+        for label, query in build_queries(target["location"], target["politician"])
+    ]
+
+def fetch_batch_records(targets, max_workers=None, max_wait=None):
+    # Todas las consultas del lote comparten un solo presupuesto: cada tanda es del tamaño de los cupos que
+    # concede el planificador en ese momento, así el tiempo total depende de la cuota y no del número de
+    # ubicaciones. Lo descargado se clasifica en segundo plano por bloques de BATCH_SCORE_CHUNK tweets mientras
+    # siguen llegando resultados y mientras se espera la ventana siguiente. Con max_wait=0 se reservan todas
+    # las consultas de una vez o ninguna. Un 429 de la API o una cuota que no se libera dentro de max_wait no descartan las tandas ya
+    # descargadas: las consultas afectadas se reintentan una vez y, si no, sus ubicaciones quedan incompletas.
+    # Devuelve (registros por clave, claves con alguna búsqueda fallida o cortada)
+    get_twitter_client()
+    max_wait = BATCH_RATELIMIT_MAX_WAIT if max_wait is None else max_wait
+    items = batch_query_items(targets)
+    records = {report_cache_key(t["location"], t["politician"]): [] for t in targets}
+    incomplete = set()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-score") as scorer:
+        scoring, unscored = [], []
+
+        def score_unscored():
+            scoring.append(scorer.submit(contextvars.copy_context().run, score_records, unscored[:]))
+            unscored.clear()
+
+        fetched, retried = False, set()
+        while items:
+            try:
+                with metrics.timed("rate_limit_wait"):
+                    if max_wait > 0:
+                        size = rate_limiter.acquire_up_to(len(items), max_wait)
+                    else:
+                        size = len(items)
+                        rate_limiter.acquire(size, max_wait)
+            except RateLimitExceeded as e:
+                if not fetched:
+                    raise
+                logger.warning(f"Batch: stopping with {len(items)} queries pending: {e}")
+                incomplete.update(report_cache_key(location, politician) for location, politician, _, _ in items)
+                break
+            wave, items = items[:size], items[size:]
+            fetched = True
+            logger.info(f"Batch: fetching {len(wave)} queries, {len(items)} pending")
+            arrived = set()
+            try:
+                for location, politician, label, query, pages, complete in iter_query_responses(wave, max_workers):
+                    arrived.add((location, politician, label, query))
+                    if not complete:
+                        incomplete.add(report_cache_key(location, politician))
+                    if pages is not None:
+                        new_records = pages_to_records(location, label, query, pages, politician, complete)
+                        records[report_cache_key(location, politician)].extend(new_records)
+                        unscored.extend(new_records)
+                    if len(unscored) >= BATCH_SCORE_CHUNK:
+                        score_unscored()
+            except RateLimitExceeded as e:
+                missing = [item for item in wave if item not in arrived]
+                logger.warning(f"Batch: {len(missing)} queries rate limited, retrying them in the next wave: {e}")
+                retry = []
+                for item in missing:
+                    if item in retried:
+                        incomplete.add(report_cache_key(item[0], item[1]))
+                    else:
+                        retried.add(item)
+                        retry.append(item)
+                items = retry + items
+            if unscored:
+                score_unscored()
+        for future in scoring:
+            future.result()
+    return records, incomplete
+
+def comparison_row(target, analysis):
+    classified = analysis["classified"]
+    total, counts = unique_sentiment_counts(classified)
+    volumes = {concept: len(classified[concept]["tweets"]) for concept in PND_CONCEPTS}
+    negatives = {concept: classified[concept]["sentiments"]["negativo"] / volumes[concept] for concept in PND_CONCEPTS if volumes[concept]}
+    return {
+        "location": target["location"],
+        "politician": target["politician"],
+        "tweets": total,
+        "positivo": round(counts["positivo"] / total * 100, 1) if total else 0.0,
+        "negativo": round(counts["negativo"] / total * 100, 1) if total else 0.0,
+        "neutral": round(counts["neutral"] / total * 100, 1) if total else 0.0,
+        "top_concept": max(volumes, key=volumes.get) if total else None,
+        "most_negative_concept": max(negatives, key=negatives.get) if negatives else None,
+        "complete": analysis.get("complete", True),
     }
 
+def cached_batch_analyses(targets):
+    # Devuelve ({clave: análisis en caché}, targets que hay que calcular)
+    analyses, pending = {}, []
+    for target in targets:
+        analysis, _ = peek_cached_analysis(target["location"], target["politician"])
+        key = report_cache_key(target["location"], target["politician"])
+        if analysis is not None:
+            analyses[key] = analysis
+        else:
+            pending.append(target)
+    return analyses, pending
+
+def analyze_batch(targets, max_workers=None, max_wait=None, cached=None):
+    # Análisis de varias ubicaciones: búsquedas con un presupuesto común y lotes grandes del modelo de
+    # sentimiento compartidos entre ubicaciones. Lo que ya está en caché no se vuelve a buscar.
+    # cached: resultado de cached_batch_analyses, si ya se consultó la caché
+    analyses, pending = cached or cached_batch_analyses(targets)
+
+    if pending:
+        records, incomplete = fetch_batch_records(pending, max_workers, max_wait)
+        for target in pending:
+            key = report_cache_key(target["location"], target["politician"])
+            if tweet_store:
+                records[key] = load_report_records(target["location"], target["politician"])
+            records[key] = dedupe_records(records[key])
+        # Lo descargado ya se clasificó por tandas; aquí solo quedan duplicados entre ubicaciones (aciertos de
+        # caché) y lo almacenado sin sentimiento
+        all_records = [record for target_records in records.values() for record in target_records]
+        logger.info(f"Batch: scoring {len(all_records)} tweets for {len(pending)} locations")
+        score_records(all_records)
+
+        for target in pending:
+            key = report_cache_key(target["location"], target["politician"])
+            target_records = records[key]
+            tweet_texts = records_to_tweet_texts(target_records, [record["sentiment"] or "neutral" for record in target_records])
+            analyses[key] = with_report_sections(build_analysis(tweet_texts, target["location"], key not in incomplete), target["location"])
+            if report_cache:
+                report_cache.put(key, analyses[key])
+
+    reports, comparison = [], []
+    for target in targets:
+        analysis = analyses[report_cache_key(target["location"], target["politician"])]
+        report, chart_data = render_report(analysis, target["location"], target["candidate_name"])
+        reports.append({**target, "report": report, "chart_data": chart_data})
+        comparison.append(comparison_row(target, analysis))
+    return {"reports": reports, "comparison": comparison}
+
 def job(location="Bogotá", candidate_name="[Nombre del Candidato]", politician=None):
     try:
-        tweet_texts, _ = search_and_summarize_tweets(location, politician)
-        classified = classify_tweets(tweet_texts)
-        plan = generate_plan_and_discourse(classified, location)
-        chart_data = get_chart_data(classified)
-        report = generate_structured_report(classified, chart_data, plan["conceptos"], candidate_name, location)
-        return report, chart_data
+        return render_report(cached_analysis(location, politician), location, candidate_name)
+    except RateLimitExceeded as e:
+        logger.warning(f"Job deferred: {e}")
+        return {"error": str(e), "retry_after": e.retry_after}, {}
     except Exception as e:
         logger.error(f"Error in job: {e}")
         return {"error": str(e)}, {}
 
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def concept_event(classified, concept, completed, location):
+    # Solo el bloque de análisis de este concepto (el cliente los va juntando); el texto completo llega en el
+    # evento summary. El gráfico sí se envía entero: son unos pocos conteos por concepto
+    chart_data = get_chart_data(classified)
+    return sse_event("concept", {
+        "concept": concept,
+        "completed": completed,
+        "total": len(PND_CONCEPTS),
+        "tweets": classified[concept]["tweets"],
+        "sentiments": classified[concept]["sentiments"],
+        "analisis": "\n".join(analisis_concepto_lines(concept, classified[concept])),
+        "chart_data": chart_data,
+        "chart_config": generate_grafico_visuales(chart_data, location)["chart_config"]
+    })
+
+def stream_report(location="Bogotá", candidate_name="[Nombre del Candidato]", politician=None):
+    # Emite un evento por concepto en cuanto termina y al final el reporte completo con el resumen ejecutivo
+    try:
+        analysis, _ = peek_cached_analysis(location, politician)
+        if analysis is not None:
+            # Análisis en caché: se emiten todos los conceptos de una vez
+            for completed, concept in enumerate(PND_CONCEPTS, start=1):
+                yield concept_event(analysis["classified"], concept, completed, location)
+        else:
+            tweet_texts, completed, complete = [], 0, True
+            for concepts, concept_tweets, concept_complete in iter_concept_tweets(location, politician):
+                tweet_texts.extend(concept_tweets)
+                complete = complete and concept_complete
+                classified = classify_tweets(tweet_texts)
+                for concept in concepts:
+                    completed += 1
+                    yield concept_event(classified, concept, completed, location)
+            if tweet_store:
+                # Los eventos muestran la parte de cada concepto; el reporte final (y el que queda en caché) cubre
+                # los mismos tweets almacenados que /analyze
+                records = dedupe_records(load_report_records(location, politician))
+                tweet_texts = records_to_tweet_texts(records, score_records(records))
+            analysis = with_report_sections(build_analysis(tweet_texts, location, complete), location)
+            if report_cache:
+                report_cache.put(report_cache_key(location, politician), analysis)
+        report, chart_data = render_report(analysis, location, candidate_name)
+        yield sse_event("summary", {"resumen": report["resumen"], "report": report, "chart_data": chart_data})
+    except RateLimitExceeded as e:
+        logger.warning(f"Stream deferred: {e}")
+        yield sse_event("failure", {"message": str(e), "retry_after": e.retry_after})
+    except Exception as e:
+        logger.error(f"Error in report stream: {e}")
+        yield sse_event("failure", {"message": str(e)})
+    yield sse_event("done", {})
+
+def rate_limited_response(message, retry_after):
+    response = jsonify({"status": "error", "message": message, "retry_after": retry_after})
+    return response, 429, {"Retry-After": str(int(retry_after) + 1)}
+
 # Flask Routes
 @app.route('/')
 def index():
@@ -435,21 +1190,266 @@ def webpage():
 def analyze():
     try:
         data = request.get_json()
-        location = data.get('location', 'Bogotá')
+        location = data.get('location') or 'Bogotá'
         candidate_name = data.get('candidate_name', '[Nombre del Candidato]')
-        politician = data.get('politician', None)
+        politician = data.get('politician') or None
 
-        report, chart_data = job(location, candidate_name, politician)
+        if data.get('async'):
+            # Con el análisis en caché se responde de inmediato, sin pasar por la cola
+            analysis, cache_state = peek_cached_analysis(location, politician)
+            if analysis is not None:
+                report, chart_data = render_report(analysis, location, candidate_name)
+                return jsonify({"status": "success", "cache": cache_state, "report": report, "chart_data": chart_data})
+
+            # Encola el análisis y responde de inmediato; el resultado se consulta en /jobs/<id>
+            job_id = job_queue.submit(
+                key=report_cache_key(location, politician),
+                fn=cached_analysis,
+                args=(location, politician),
+                params={"location": location, "candidate_name": candidate_name}
+            )
+            return jsonify({"status": "queued", "job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+        with metrics.collect_timings(enabled=bool(data.get('timings'))) as timings:
+            report, chart_data = job(location, candidate_name, politician)
+        if "retry_after" in report:
+            return rate_limited_response(report["error"], report["retry_after"])
         if "error" in report:
             return jsonify({"status": "error", "message": report["error"]}), 500
+        response = {
+            "status": "success",
+            "report": report,
+            "chart_data": chart_data
+        }
+        if timings:
+            response["timings"] = timings.as_dict()
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"Error in /analyze: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch_route():
+    try:
+        data = request.get_json() or {}
+        targets = batch_targets(data)
+        if not targets:
+            return jsonify({"status": "error", "message": "Se requiere una lista de ubicaciones"}), 400
+        if len(targets) > BATCH_MAX_LOCATIONS:
+            return jsonify({"status": "error", "message": f"Máximo {BATCH_MAX_LOCATIONS} ubicaciones por lote"}), 400
+
+        if data.get('async'):
+            job_id = job_queue.submit(
+                key="batch|" + json.dumps(targets, sort_keys=True),
+                fn=analyze_batch,
+                args=(targets,),
+                params={"batch": True}
+            )
+            return jsonify({"status": "queued", "job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+        # Sin "async" no se espera a la ventana siguiente: el lote se reserva completo de la cuota que queda
+        # (o responde 429 sin gastarla) y los lotes grandes se rechazan para no superar el timeout de gunicorn
+        cached = cached_batch_analyses(targets)
+        queries, max_queries = len(batch_query_items(cached[1])), min(BATCH_SYNC_MAX_QUERIES, rate_limiter.limit)
+        if queries > max_queries:
+            message = f"El lote requiere {queries} consultas a Twitter; con más de {max_queries} use \"async\": true"
+            return jsonify({"status": "error", "message": message}), 400
+        with metrics.collect_timings(enabled=bool(data.get('timings'))) as timings:
+            result = analyze_batch(targets, max_wait=0, cached=cached)
+        if timings:
+            result["timings"] = timings.as_dict()
+        return jsonify({"status": "success", **result})
+    except RateLimitExceeded as e:
+        logger.warning(f"Batch deferred: {e}")
+        return rate_limited_response(str(e), e.retry_after)
+    except Exception as e:
+        logger.error(f"Error in /analyze/batch: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/analyze/stream', methods=['GET'])
+def analyze_stream():
+    location = request.args.get('location') or 'Bogotá'
+    candidate_name = request.args.get('candidate_name', '[Nombre del Candidato]')
+    politician = request.args.get('politician') or None
+    return Response(
+        stream_with_context(stream_report(location, candidate_name, politician)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+def backfill_concepts(rows, concept_rows):
+    # Tweets guardados antes de que se almacenaran los conceptos: se clasifican una vez y se guardan
+    assigned = {tweet_id for tweet_id, _ in concept_rows}
+    missing = [row[0] for row in rows if row[0] not in assigned]
+    if not missing:
+        return concept_rows
+    texts = tweet_store.texts(missing)
+    concepts_by_id = {
+        tweet_id: concepts or [NO_CONCEPT]
+        for tweet_id, concepts in zip(texts, keyword_matcher.match_many(list(texts.values())))
+    }
+    tweet_store.set_concepts(concepts_by_id)
+    logger.info(f"Backfilled concepts for {len(concepts_by_id)} stored tweets")
+    return concept_rows + [(tweet_id, concept) for tweet_id, concepts in concepts_by_id.items() for concept in concepts]
+
+def load_analytics_frame(location, politician=None, days=ANALYTICS_DAYS):
+    import analytics
+
+    with metrics.timed("analytics_load"):
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        rows, concept_rows = tweet_store.load_columns(location, politician, since=since, limit=ANALYTICS_MAX_TWEETS, scored_only=True)
+        concept_rows = backfill_concepts(rows, concept_rows)
+    with metrics.timed("analytics_build"):
+        return analytics.SentimentFrame.from_rows(rows, ANALYTICS_COLUMNS, concept_rows, PND_CONCEPTS, ANALYTICS_TIMEZONE)
+
+def cached_analytics_frame(location, politician=None, days=ANALYTICS_DAYS):
+    if analytics_cache is None:
+        return load_analytics_frame(location, politician, days)
+    frame, _ = analytics_cache.get(f"{report_cache_key(location, politician)}|{days}",
+                                   lambda: load_analytics_frame(location, politician, days))
+    return frame
+
+@app.route('/analytics', methods=['GET'])
+def analytics_route():
+    # Agregados sobre todo lo almacenado para una ubicación (no solo la última búsqueda)
+    if tweet_store is None:
+        return jsonify({"status": "error", "message": "La analítica requiere el almacén de tweets (TWEET_STORE_DB)"}), 503
+    try:
+        location = request.args.get('location') or 'Bogotá'
+        politician = request.args.get('politician') or None
+        days = int(request.args.get('days', ANALYTICS_DAYS))
+        freq = request.args.get('freq', 'D').upper()
+        if freq not in ("H", "D"):
+            return jsonify({"status": "error", "message": "freq debe ser H (por hora) o D (por día)"}), 400
+
+        frame = cached_analytics_frame(location, politician, days)
+        with metrics.timed("analytics_aggregate"):
+            summary = frame.summary(freq)
+            summary["chart_config"] = generate_grafico_visuales(frame.chart_data(), location)["chart_config"]
+            summary["trend_chart_config"] = generate_trend_chart(summary["trend"], location) if summary["trend"]["labels"] else None
+        return jsonify({"status": "success", "location": location, "politician": politician, "days": days, **summary})
+    except Exception as e:
+        logger.error(f"Error in /analytics: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+PLAN_EXPORT_COLUMNS = ["concepto", "necesidad", "propuesta", "impacto", "positivo", "negativo", "neutral", "negativo_pct"]
+
+def iter_tweet_export_rows(location="Bogotá", politician=None, days=None):
+    # Sin almacén se exportan los tweets del último análisis (en caché o recién calculado)
+    if tweet_store is None:
+        analysis = cached_analysis(location, politician)
+        tweets = {}
+        for concept, data in analysis["classified"].items():
+            for tweet in data["tweets"]:
+                row = tweets.setdefault(tweet.get("id") or tweet["text"], {"id": tweet.get("id"), "text": tweet["text"],
+                                                                           "sentiment": tweet["sentiment"], "concepts": []})
+                row["concepts"].append(concept)
+        for row in tweets.values():
+            row["concepts"] = CONCEPT_SEPARATOR.join(row["concepts"])
+            yield row
+        return
+
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+    for row in tweet_store.iter_export(location, politician, since=since, chunk_size=EXPORT_CHUNK_ROWS):
+        if row["concepts"] is None:
+            # Tweets guardados antes de almacenar los conceptos; se clasifican al vuelo sin escribir en la base
+            row["concepts"] = CONCEPT_SEPARATOR.join(keyword_matcher.match(row["text"] or "") or [NO_CONCEPT])
+        yield row
+
+def iter_plan_export_rows(analysis):
+    for item in analysis["plan"]["conceptos"]:
+        sentiments = analysis["classified"].get(item["concepto"], {}).get("sentiments", {"positivo": 0, "negativo": 0, "neutral": 0})
+        total = sum(sentiments.values())
+        yield {
+            "concepto": item["concepto"],
+            "necesidad": item["necesidad"],
+            "propuesta": item["propuesta"],
+            "impacto": item["impacto"],
+            **sentiments,
+            "negativo_pct": round(sentiments["negativo"] / total * 100, 1) if total else 0.0
+        }
+
+EXPORT_KINDS = {"tweets": EXPORT_COLUMNS, "plan": PLAN_EXPORT_COLUMNS}
+
+def export_rows(kind, location="Bogotá", politician=None, days=None):
+    # Devuelve (generador de filas, columnas); el plan usa el análisis en caché
+    if kind == "plan":
+        return iter_plan_export_rows(cached_analysis(location, politician)), PLAN_EXPORT_COLUMNS
+    return iter_tweet_export_rows(location, politician, days), EXPORT_COLUMNS
+
+@app.route('/export/<kind>.<fmt>', methods=['GET'])
+def export_route(kind, fmt):
+    if kind not in EXPORT_KINDS or fmt not in export.CONTENT_TYPES:
+        return jsonify({"status": "error", "message": f"Exportaciones disponibles: {', '.join(EXPORT_KINDS)} en {', '.join(export.CONTENT_TYPES)}"}), 400
+    try:
+        location = request.args.get('location') or 'Bogotá'
+        politician = request.args.get('politician') or None
+        days = int(request.args['days']) if request.args.get('days') else None
+        rows, columns = export_rows(kind, location, politician, days)
+        chunks = export.iter_export(rows, columns, fmt, EXPORT_CHUNK_ROWS)
+        # El primer bloque se produce antes de responder, para devolver los errores con su código de estado
+        first = next(chunks, b"")
+    except RateLimitExceeded as e:
+        return rate_limited_response(str(e), e.retry_after)
+    except export.ExportUnavailable as e:
+        return jsonify({"status": "error", "message": str(e)}), 501
+    except Exception as e:
+        logger.error(f"Error in /export: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+    def generate():
+        yield first
+        for chunk in chunks:
+            yield chunk
+
+    filename = f"{kind}_{location}.{fmt}".replace(" ", "_")
+    return Response(
+        stream_with_context(generate()),
+        mimetype=export.CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "report_cache": report_cache.stats() if report_cache else None,
+        "analytics_cache": analytics_cache.stats() if analytics_cache else None,
+        "sentiment_cache": sentiment_cache.stats()
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        queued_job = job_queue.get(job_id)
+        if queued_job is None:
+            return jsonify({"status": "error", "message": "Trabajo no encontrado"}), 404
+        if queued_job["status"] == "error":
+            if queued_job["retry_after"] is not None:
+                return rate_limited_response(queued_job["error"], queued_job["retry_after"])
+            return jsonify({"status": "error", "message": queued_job["error"]}), 500
+        if queued_job["status"] != "done":
+            return jsonify({"status": queued_job["status"], "job_id": job_id})
+
+        params = queued_job["params"]
+        if params.get("batch"):
+            return jsonify({"status": "success", "job_id": job_id, **queued_job["result"]})
+        report, chart_data = render_report(queued_job["result"], params["location"], params["candidate_name"])
         return jsonify({
             "status": "success",
+            "job_id": job_id,
             "report": report,
             "chart_data": chart_data
         })
     except Exception as e:
-        logger.error(f"Error in /analyze: {e}")
+        logger.error(f"Error in /jobs/{job_id}: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+if SENTIMENT_WARMUP:
+    warm_up()
+
 #if __name__ == "__main__":
     #app.run(debug=False)
\ No newline at end of file
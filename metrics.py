@@ -0,0 +1,201 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import wraps
+
+# Límites (segundos) de los histogramas de etapas: desde el formateo de texto hasta búsquedas lentas
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_NOOP = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(labelnames, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    # Métricas del proceso en formato de texto de Prometheus. Con enabled=False las operaciones
+    # terminan en una sola comparación. Con gunicorn cada worker tiene su propio registro
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(self, name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        metric = Histogram(self, name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    "electionsapp_stage_seconds", "Duración de cada etapa del análisis", ("stage",)
+)
+sentiment_batch_size = registry.histogram(
+    "electionsapp_sentiment_batch_size", "Textos por llamada al modelo de sentimiento", buckets=BATCH_SIZE_BUCKETS
+)
+tweets_fetched = registry.counter("electionsapp_tweets_fetched_total", "Tweets recibidos de la API de Twitter")
+tweets_scored = registry.counter("electionsapp_tweets_scored_total", "Tweets clasificados por el modelo de sentimiento")
+twitter_api_calls = registry.counter("electionsapp_twitter_api_calls_total", "Llamadas a search_recent_tweets", ("outcome",))
+twitter_retries = registry.counter("electionsapp_twitter_retries_total", "Reintentos de búsqueda tras un error 429")
+sentiment_cache_lookups = registry.counter("electionsapp_sentiment_cache_lookups_total", "Consultas a la caché de sentimiento", ("result",))
+report_cache_lookups = registry.counter("electionsapp_report_cache_lookups_total", "Consultas a la caché de reportes", ("result",))
+
+
+class RequestTimings:
+    # Tiempo acumulado por etapa dentro de una solicitud. Las etapas que corren en varios hilos
+    # (p. ej. las búsquedas) suman el tiempo de cada hilo, por lo que pueden superar al total
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_dict(self):
+        with self._lock:
+            timings = {stage: round(seconds, 6) for stage, seconds in self.stages.items()}
+        timings["total"] = round(time.perf_counter() - self._start, 6)
+        return timings
+
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class collect_timings:
+    # with collect_timings() as timings: ... ; luego timings.as_dict(). Con enabled=False devuelve None
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+
+    def __enter__(self):
+        if not self.enabled:
+            return None
+        self.timings = RequestTimings()
+        self._token = _request_timings.set(self.timings)
+        return self.timings
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            _request_timings.reset(self._token)
+        return False
+
+
+class _Stage:
+    __slots__ = ("stage", "timings", "start")
+
+    def __init__(self, stage, timings):
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stage_seconds.observe(elapsed, stage=self.stage)
+        if self.timings is not None:
+            self.timings.add(self.stage, elapsed)
+        return False
+
+
+def timed(stage):
+    # Context manager que mide una etapa; sin métricas ni desglose por solicitud no hace nada
+    timings = _request_timings.get()
+    if not registry.enabled and timings is None:
+        return _NOOP
+    return _Stage(stage, timings)
+
+
+def instrument(stage):
+    # Decorador equivalente a envolver toda la función en timed(stage)
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+# Recursos que no sobreviven a un fork (conexiones SQLite, pools de hilos): bajo gunicorn --preload el maestro
+# puede crearlos antes del fork, así que cada proceso crea los suyos la primera vez que los usa
+import os
+import sqlite3
+
+# Límite de variables por consulta en SQLite
+SQLITE_CHUNK = 500
+
+
+class PerProcess:
+    # Llamable que devuelve factory(), creado una vez por proceso
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = None
+        self._pid = None
+
+    def __call__(self):
+        if self._pid != os.getpid():
+            self._value = self.factory()
+            self._pid = os.getpid()
+        return self._value
+
+
+def connect_sqlite(db_path, schema, isolation_level=""):
+    # Conexión en modo WAL (lectores y escritor de distintos workers no se bloquean) con el esquema creado.
+    # La comparten los hilos del proceso; cada clase la usa bajo su propio lock
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=isolation_level, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(schema)
+    return conn
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from per_process import PerProcess, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS quota (endpoint TEXT PRIMARY KEY, remaining INTEGER NOT NULL, reset_at REAL NOT NULL);"
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after):
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(f"Límite de la API de Twitter agotado, reintentar en {self.retry_after:.0f} segundos")
+
+
+class RateLimitScheduler:
+    # Cuota de la API compartida por todos los workers a través de un archivo SQLite.
+    # Cada solicitud reserva de una vez todos los cupos que necesita (todo o nada), de modo que
+    # varias solicitudes simultáneas no se reparten la cuota y terminan todas incompletas.
+    # Los lotes, que de todos modos avanzan por tandas, toman con acquire_up_to lo que haya disponible.
+    def __init__(self, db_path, limit=450, window=900, endpoint="search_recent"):
+        self.db_path = db_path
+        self.limit = limit
+        self.window = window
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self._connection = PerProcess(lambda: connect_sqlite(self.db_path, SCHEMA, isolation_level=None))
+
+    def _current(self, conn, now):
+        row = conn.execute("SELECT remaining, reset_at FROM quota WHERE endpoint = ?", (self.endpoint,)).fetchone()
+        if row is None or now >= row[1]:
+            # Ventana nueva: la cuota se recarga por completo
+            return self.limit, now + self.window
+        return row
+
+    def _reserve(self, slots, minimum):
+        # Descuenta min(slots, cupos restantes) si quedan al menos `minimum`, en una sola transacción.
+        # Devuelve (cupos concedidos o None, segundos que faltan para la próxima ventana)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                remaining, reset_at = self._current(conn, now)
+                granted = min(slots, remaining) if remaining >= minimum else None
+                if granted:
+                    remaining -= granted
+                conn.execute(
+                    "INSERT OR REPLACE INTO quota (endpoint, remaining, reset_at) VALUES (?, ?, ?)",
+                    (self.endpoint, remaining, reset_at)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return granted, max(reset_at - now, 0.001)
+
+    def _wait_for(self, slots, minimum, max_wait):
+        # Si la cuota está agotada espera solo si la ventana se libera dentro de max_wait;
+        # en caso contrario falla de inmediato con el tiempo de reintento
+        deadline = time.time() + (max_wait or 0)
+        while True:
+            granted, retry_after = self._reserve(slots, minimum)
+            if granted is not None:
+                return granted
+            if time.time() + retry_after > deadline:
+                raise RateLimitExceeded(retry_after)
+            logger.info(f"Twitter quota exhausted, deferring {slots} queries for {retry_after:.1f}s")
+            time.sleep(retry_after)
+
+    def try_acquire(self, slots=1):
+        # Devuelve 0 si se obtuvieron los cupos, o los segundos que faltan para la próxima ventana
+        granted, retry_after = self._reserve(slots, slots)
+        return 0.0 if granted is not None else retry_after
+
+    def acquire(self, slots=1, max_wait=0):
+        # Todo o nada: reserva los `slots` cupos juntos
+        if slots > self.limit:
+            raise ValueError(f"Se pidieron {slots} cupos pero el límite por ventana es {self.limit}")
+        self._wait_for(slots, slots, max_wait)
+
+    def acquire_up_to(self, slots, max_wait=0):
+        # Reserva los cupos disponibles hasta `slots` (al menos uno) y devuelve cuántos se concedieron:
+        # quien procesa por tandas dimensiona cada tanda con lo que de verdad obtuvo
+        return self._wait_for(slots, 1, max_wait)
+
+    def update(self, remaining, reset_at):
+        # Sincroniza la cuota con los valores que reporta la API (encabezados x-rate-limit-*)
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO quota (endpoint, remaining, reset_at) VALUES (?, ?, ?)",
+                (self.endpoint, remaining, reset_at)
+            )
+
+    def update_from_headers(self, headers):
+        try:
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset_at = float(headers["x-rate-limit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current_remaining, current_reset_at = self._current(conn, time.time())
+                if reset_at <= current_reset_at + 1:
+                    # Misma ventana: los cupos ya reservados localmente aún no se reflejan en la API
+                    remaining = min(remaining, current_remaining)
+                conn.execute(
+                    "INSERT OR REPLACE INTO quota (endpoint, remaining, reset_at) VALUES (?, ?, ?)",
+                    (self.endpoint, remaining, reset_at)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def mark_exhausted(self, reset_at=None):
+        reset_at = float(reset_at) if reset_at else time.time() + self.window
+        self.update(0, reset_at)
+        return max(reset_at - time.time(), 0.0)
+
+    def status(self):
+        with self._lock:
+            remaining, reset_at = self._current(self._connection(), time.time())
+        return {"remaining": remaining, "limit": self.limit, "reset_in": max(reset_at - time.time(), 0.0)}
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from per_process import PerProcess
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache:
+    # Caché LRU de análisis por (location, politician) con TTL. Una entrada vencida se sigue sirviendo
+    # durante stale_ttl mientras se recalcula en segundo plano (stale-while-revalidate), y las
+    # solicitudes simultáneas de la misma clave comparten un único cálculo. ttl_for(valor), si se indica,
+    # da el TTL de cada entrada (p. ej. uno corto para análisis incompletos).
+    def __init__(self, ttl=600, max_entries=64, stale_ttl=3600, refresh_workers=1, ttl_for=None):
+        self.ttl = ttl
+        self.ttl_for = ttl_for
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.refresh_workers = refresh_workers
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        self._refresh_executor = PerProcess(
+            lambda: ThreadPoolExecutor(max_workers=self.refresh_workers, thread_name_prefix="report-refresh")
+        )
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+        self.compute_seconds = 0.0
+
+    def _remember(self, key, value):
+        self._entries[key] = (value, time.monotonic(), self.ttl if self.ttl_for is None else self.ttl_for(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, key, compute):
+        # Debe llamarse con el lock tomado. Devuelve (valor, estado) o (None, "miss")
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, "miss"
+        value, stored_at, ttl = entry
+        age = time.monotonic() - stored_at
+        if age < ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, "hit"
+        if age < ttl + self.stale_ttl:
+            self._entries.move_to_end(key)
+            self.stale_hits += 1
+            if key not in self._inflight and time.monotonic() >= self._retry_at.get(key, 0):
+                self._inflight[key] = Future()
+                self.refreshes += 1
+                self._refresh_executor().submit(self._compute, key, compute)
+            return value, "stale"
+        del self._entries[key]
+        return None, "miss"
+
+    def _compute(self, key, compute):
+        # Ejecuta compute() para una clave cuyo Future ya está registrado en _inflight
+        with self._lock:
+            future = self._inflight[key]
+        start = time.perf_counter()
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                if key in self._entries:
+                    # Tras una recarga fallida se sigue sirviendo la copia vencida y no se reintenta
+                    # antes de retry_after (p. ej. cuota de Twitter agotada)
+                    self.refresh_errors += 1
+                    self._retry_at[key] = time.monotonic() + (getattr(e, "retry_after", None) or min(self.ttl, 60))
+                del self._inflight[key]
+            logger.error(f"Error computing report for {key}: {e}")
+            future.set_exception(e)
+            return
+        with self._lock:
+            self.compute_seconds += time.perf_counter() - start
+            self._remember(key, value)
+            self._retry_at.pop(key, None)
+            del self._inflight[key]
+        future.set_result(value)
+
+    def peek(self, key, compute):
+        # Como get(), pero sin calcular en caso de fallo; una entrada vencida sí dispara la recarga
+        with self._lock:
+            return self._lookup(key, compute)
+
+    def get(self, key, compute):
+        with self._lock:
+            value, state = self._lookup(key, compute)
+            if state != "miss":
+                return value, state
+            self.misses += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if leader:
+            self._compute(key, compute)
+        return future.result(), "miss"
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "in_flight": len(self._inflight),
+                "compute_seconds": self.compute_seconds,
+            }
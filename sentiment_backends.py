@@ -0,0 +1,127 @@
+import logging
+import os
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "finiteautomata/beto-sentiment-analysis"
+LABELS = {0: "negativo", 1: "neutral", 2: "positivo"}
+MAX_LENGTH = 512
+
+
+class TorchBackend:
+    # Modelo BETO original en PyTorch fp32
+    name = "torch"
+
+    def __init__(self, model_name=MODEL_NAME):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+
+    def token_lengths(self, texts):
+        return [len(ids) for ids in self.tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]]
+
+    def predict(self, texts):
+        with metrics.timed("sentiment_tokenize"):
+            inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=MAX_LENGTH)
+        with metrics.timed("sentiment_forward"), self._torch.no_grad():
+            outputs = self.model(**inputs)
+        return [LABELS[index] for index in self._torch.argmax(outputs.logits, dim=-1).tolist()]
+
+
+class QuantizedTorchBackend(TorchBackend):
+    # Cuantización dinámica int8 de las capas lineales, pensada para servidores sin GPU
+    name = "torch-int8"
+
+    def __init__(self, model_name=MODEL_NAME):
+        super().__init__(model_name)
+        self.model = self._torch.quantization.quantize_dynamic(
+            self.model, {self._torch.nn.Linear}, dtype=self._torch.qint8
+        )
+
+
+class OnnxBackend:
+    # ONNX Runtime sobre un grafo exportado desde el mismo checkpoint
+    name = "onnx"
+
+    def __init__(self, model_name=MODEL_NAME, onnx_path=None):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError("El backend 'onnx' requiere el paquete onnxruntime") from e
+        import numpy
+        from transformers import AutoTokenizer
+
+        self._numpy = numpy
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        onnx_path = onnx_path or os.path.join("onnx_models", model_name.replace("/", "--") + ".onnx")
+        if not os.path.exists(onnx_path):
+            export_onnx(model_name, onnx_path)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    def token_lengths(self, texts):
+        return [len(ids) for ids in self.tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]]
+
+    def predict(self, texts):
+        with metrics.timed("sentiment_tokenize"):
+            inputs = self.tokenizer(texts, return_tensors="np", truncation=True, padding=True, max_length=MAX_LENGTH)
+        feed = {name: value.astype(self._numpy.int64) for name, value in inputs.items() if name in self._input_names}
+        with metrics.timed("sentiment_forward"):
+            (logits,) = self.session.run(["logits"], feed)
+        return [LABELS[index] for index in logits.argmax(axis=-1).tolist()]
+
+
+def bucket_by_length(lengths, max_batch_size):
+    # Agrupa índices de textos con longitud similar para minimizar el padding de cada lote
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i:i + max_batch_size] for i in range(0, len(order), max_batch_size)]
+
+
+def export_onnx(model_name, onnx_path):
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    logger.info(f"Exporting {model_name} to ONNX at {onnx_path}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    model.config.return_dict = False
+    sample = tokenizer(["Texto de ejemplo para exportar"], return_tensors="pt")
+    # Mismo orden posicional que BertForSequenceClassification.forward
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    return onnx_path
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def load_backend(name="torch", **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de sentimiento desconocido: {name}. Opciones: {', '.join(BACKENDS)}")
+    logger.info(f"Loading sentiment backend: {name}")
+    return BACKENDS[name](**kwargs)
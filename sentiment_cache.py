@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from per_process import SQLITE_CHUNK, PerProcess, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Escrituras en disco entre cada revisión del tamaño de la tabla (COUNT(*) recorre toda la tabla)
+DISK_EVICT_EVERY = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiments (key TEXT PRIMARY KEY, label TEXT NOT NULL, accessed_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_sentiments_accessed ON sentiments (accessed_at);
+"""
+
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+def text_hash(text):
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def cache_key(tweet_id, text):
+    # Clave por contenido: ID del tweet + hash del texto normalizado
+    return f"{tweet_id or ''}:{text_hash(text)}"
+
+
+class SentimentCache:
+    # Caché LRU en memoria con un nivel opcional en disco (SQLite) compartido entre workers
+    def __init__(self, max_entries=50000, db_path=None, max_disk_entries=500000):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = PerProcess(lambda: connect_sqlite(self.db_path, SCHEMA))
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._disk_writes = 0
+
+    def _remember(self, key, label):
+        self._memory[key] = label
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            pending = []
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.hits += 1
+                else:
+                    pending.append(key)
+
+            if pending and self.db_path:
+                try:
+                    found_on_disk = self._disk_get(pending)
+                except sqlite3.Error as e:
+                    logger.error(f"Error reading sentiment cache from disk: {e}")
+                    found_on_disk = {}
+                for key, label in found_on_disk.items():
+                    self._remember(key, label)
+                    found[key] = label
+                self.disk_hits += len(found_on_disk)
+                self.hits += len(found_on_disk)
+
+            self.misses += len(set(pending) - found.keys())
+        return found
+
+    def _disk_get(self, keys):
+        conn = self._connection()
+        found = {}
+        for i in range(0, len(keys), SQLITE_CHUNK):
+            chunk = keys[i:i + SQLITE_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, label FROM sentiments WHERE key IN ({placeholders})", chunk).fetchall()
+            found.update(rows)
+        if found:
+            conn.executemany("UPDATE sentiments SET accessed_at = ? WHERE key = ?", [(time.time(), key) for key in found])
+            conn.commit()
+        return found
+
+    def set_many(self, items):
+        if not items:
+            return
+        with self._lock:
+            for key, label in items.items():
+                self._remember(key, label)
+            if self.db_path:
+                try:
+                    self._disk_set(items)
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing sentiment cache to disk: {e}")
+
+    def _disk_set(self, items):
+        conn = self._connection()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO sentiments (key, label, accessed_at) VALUES (?, ?, ?)",
+            [(key, label, now) for key, label in items.items()]
+        )
+        conn.commit()
+        # La tabla puede superar el máximo por hasta DISK_EVICT_EVERY entradas entre revisiones
+        self._disk_writes += len(items)
+        if self._disk_writes >= min(DISK_EVICT_EVERY, self.max_disk_entries):
+            self._disk_writes = 0
+            self._disk_evict(conn)
+
+    def _disk_evict(self, conn):
+        (count,) = conn.execute("SELECT COUNT(*) FROM sentiments").fetchone()
+        if count > self.max_disk_entries:
+            conn.execute(
+                "DELETE FROM sentiments WHERE key IN (SELECT key FROM sentiments ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+            conn.commit()
+            self.evictions += count - self.max_disk_entries
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.db_path:
+                conn = self._connection()
+                conn.execute("DELETE FROM sentiments")
+                conn.commit()
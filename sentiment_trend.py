@@ -0,0 +1,46 @@
+# Serie temporal de sentimiento, común al reporte (main.get_trend_data, unos cientos de tweets en Python puro)
+# y a /analytics (analytics.SentimentFrame, que agrega cientos de miles de tweets con numpy y solo entrega aquí
+# los totales por periodo). No importa numpy ni pandas
+import math
+from datetime import datetime, timezone
+
+SENTIMENTS = ["positivo", "negativo", "neutral"]
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def engagement_weight(engagement, log1p=math.log1p):
+    # Peso logarítmico: un tweet viral cuenta más, sin que uno solo domine el periodo o el concepto.
+    # Con log1p=numpy.log1p se aplica a una columna entera
+    return 1.0 + log1p(engagement)
+
+
+def bucket_start(timestamp, utc_offset, hourly):
+    # Periodo de un instante (segundos Unix) dado su desfase local en segundos; sirve igual con arreglos de numpy.
+    # Las horas son instantes (los cambios de horario no crean ni pierden horas); los días, fechas locales
+    # (medianoche local expresada como si fuera UTC)
+    local = timestamp + utc_offset
+    return timestamp - local % HOUR if hourly else local // DAY * DAY
+
+
+def trend_series(counts, weights, freq, tz):
+    # counts y weights: {periodo de bucket_start: {sentimiento: total}}. Devuelve la serie sin huecos, con el
+    # balance neto (positivo - negativo) simple y ponderado por interacción de cada periodo
+    hourly = freq.upper().startswith("H")
+    trend = {"freq": freq, "labels": [], "positivo": [], "negativo": [], "neutral": [], "net": [], "weighted_net": []}
+    if not counts:
+        return trend
+    for bucket in range(min(counts), max(counts) + 1, HOUR if hourly else DAY):
+        bucket_counts, bucket_weights = counts.get(bucket, {}), weights.get(bucket, {})
+        total, weight_total = sum(bucket_counts.values()), sum(bucket_weights.values())
+        if hourly:
+            trend["labels"].append(datetime.fromtimestamp(bucket, tz).strftime("%Y-%m-%d %H:00"))
+        else:
+            trend["labels"].append(datetime.fromtimestamp(bucket, timezone.utc).strftime("%Y-%m-%d"))
+        for sentiment in SENTIMENTS:
+            trend[sentiment].append(int(bucket_counts.get(sentiment, 0)))
+        positive, negative = bucket_counts.get("positivo", 0), bucket_counts.get("negativo", 0)
+        trend["net"].append(round((positive - negative) / total, 4) if total else 0.0)
+        weighted = bucket_weights.get("positivo", 0.0) - bucket_weights.get("negativo", 0.0)
+        trend["weighted_net"].append(round(weighted / weight_total, 4) if weight_total else 0.0)
+    return trend
@@ -22,7 +22,7 @@ function switchTab(event) {
     let content = '';
     switch (section) {
         case 'resumen':
-            content = `<h3>Análisis general de la situación política actual</h3><p>${convertBold(report.resumen ? report.resumen.replace(/^\s*-\s*/gm, '').replace('Tendencias generales', '<strong>Tendencias generales</strong>') : 'No hay resumen disponible')}</p>`;
+            content = resumenHtml(report);
             break;
         case 'analisis':
             const analisisText = report.analisis || '';
@@ -92,6 +92,7 @@ function switchTab(event) {
             break;
         case 'grafico':
             content = `<h3>Gráfico Sugerido</h3><p>${convertBold(report.grafico || 'No gráfico sugerido disponible')}</p><canvas id="chartCanvas"></canvas>`;
+            if (report.trend_chart_config) content += '<canvas id="trendCanvas"></canvas>';
             break;
         default:
             content = '<p>Selecciona una sección para ver el contenido.</p>';
@@ -101,6 +102,9 @@ function switchTab(event) {
     if (section === 'grafico' && window.currentReport?.chart_config) {
         renderChart(window.currentReport.chart_config);
     }
+    if (section === 'grafico' && window.currentReport?.trend_chart_config) {
+        renderTrendChart(window.currentReport.trend_chart_config);
+    }
     console.log("Content updated at:", new Date().toLocaleString('es-ES', { timeZone: 'CET' }));
 }
 
@@ -179,9 +183,105 @@ function prioritizeStrategy(concept, event) {
 
 // Function to render chart (requires Chart.js)
 function renderChart(config) {
-    const ctx = document.getElementById('chartCanvas').getContext('2d');
+    const canvas = document.getElementById('chartCanvas');
+    if (!canvas) return;
+    // Update the existing chart in place while streamed concepts arrive
+    if (window.myChart && window.myChart.canvas === canvas) {
+        window.myChart.data.labels = config.data.labels;
+        window.myChart.data.datasets = config.data.datasets;
+        window.myChart.update();
+        return;
+    }
     if (window.myChart) window.myChart.destroy();
-    window.myChart = new Chart(ctx, config);
+    window.myChart = new Chart(canvas.getContext('2d'), config);
+}
+
+// Function to render the sentiment trend over time (requires Chart.js)
+function renderTrendChart(config) {
+    const canvas = document.getElementById('trendCanvas');
+    if (!canvas) return;
+    if (window.trendChart) window.trendChart.destroy();
+    window.trendChart = new Chart(canvas.getContext('2d'), config);
+}
+
+// Function to poll a background analysis job until it finishes
+async function pollJob(statusUrl, intervalMs = 2000) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        const response = await fetch(statusUrl);
+        const result = await response.json();
+        console.log('Job status at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), result.status);
+        if (result.status !== 'queued' && result.status !== 'running') {
+            return result;
+        }
+    }
+}
+
+// Function to build the executive summary section
+function resumenHtml(report) {
+    return `<h3>Análisis general de la situación política actual</h3><p>${convertBold(report.resumen ? report.resumen.replace(/^\s*-\s*/gm, '').replace('Tendencias generales', '<strong>Tendencias generales</strong>') : 'No hay resumen disponible')}</p>`;
+}
+
+// Function to render the tab layout for a report
+function renderResults(resultsDiv, initialContent) {
+    resultsDiv.innerHTML = `
+        <div class="large-box">
+            <div id="stream-progress" class="stream-progress"></div>
+            <div class="tab-container">
+                <div class="tab active" data-section="resumen" onclick="switchTab(event)">Resumen Ejecutivo</div>
+                <div class="tab" data-section="analisis" onclick="switchTab(event)">Análisis de Datos</div>
+                <div class="tab" data-section="plan" onclick="switchTab(event)">Plan Estratégico</div>
+                <div class="tab" data-section="discurso" onclick="switchTab(event)">Discurso</div>
+                <div class="tab" data-section="grafico" onclick="switchTab(event)">Gráfico Sugerido</div>
+            </div>
+            <div id="content-area" class="content-area">${initialContent}</div>
+        </div>
+    `;
+}
+
+// Function to stream partial results per PND concept through Server-Sent Events
+function streamAnalysis(data, resultsDiv) {
+    const params = new URLSearchParams({ location: data.location, candidate_name: data.candidate_name });
+    if (data.politician) params.set('politician', data.politician);
+    const source = new EventSource(`/analyze/stream?${params}`);
+    window.currentReport = {};
+    renderResults(resultsDiv, '<p>Procesando conceptos del PND...</p>');
+
+    // Each concept event carries only its own analysis block; the summary event brings the full report
+    const analisisBlocks = {};
+    source.addEventListener('concept', (event) => {
+        const payload = JSON.parse(event.data);
+        console.log('Concept received at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), payload.concept);
+        analisisBlocks[payload.concept] = payload.analisis;
+        window.currentReport.analisis = Object.values(analisisBlocks).filter(Boolean).join('\n');
+        window.currentReport.chart_config = payload.chart_config;
+        document.getElementById('stream-progress').textContent = `Conceptos completados: ${payload.completed}/${payload.total} (último: ${payload.concept})`;
+        renderChart(payload.chart_config);
+    });
+
+    source.addEventListener('summary', (event) => {
+        const payload = JSON.parse(event.data);
+        window.currentReport = payload.report || {};
+        document.getElementById('stream-progress').textContent = '';
+        const activeTab = document.querySelector('.tab.active');
+        if (activeTab && activeTab.getAttribute('data-section') === 'resumen') {
+            document.getElementById('content-area').innerHTML = resumenHtml(window.currentReport);
+        }
+        renderChart(window.currentReport.chart_config);
+    });
+
+    source.addEventListener('failure', (event) => {
+        const payload = JSON.parse(event.data);
+        resultsDiv.innerHTML = `Error: ${payload.message || 'Error desconocido'}`;
+    });
+
+    source.addEventListener('done', () => source.close());
+
+    // Avoid EventSource auto-reconnecting, which would restart the whole analysis
+    source.onerror = (error) => {
+        console.error('Stream error at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), error);
+        source.close();
+    };
 }
 
 // Función para convertir Markdown **texto** a <strong>texto</strong>
@@ -204,7 +304,9 @@ document.addEventListener('DOMContentLoaded', () => {
         const formData = new FormData(form);
         const data = {
             location: formData.get('location') || 'Bogotá',
-            candidate_name: formData.get('candidate_name') || '[Nombre del Candidato]'
+            candidate_name: formData.get('candidate_name') || '[Nombre del Candidato]',
+            politician: formData.get('politician') || null,
+            async: true
         };
 
         console.log('Form data collected at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), data);
@@ -212,6 +314,12 @@ document.addEventListener('DOMContentLoaded', () => {
         const resultsDiv = document.getElementById('results');
         resultsDiv.innerHTML = 'Procesando...';
 
+        // Prefer streaming so each concept shows up as soon as it is ready
+        if (window.EventSource) {
+            streamAnalysis(data, resultsDiv);
+            return;
+        }
+
         try {
             console.log('Sending fetch request to /analyze at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }));
             const response = await fetch('/analyze', {
@@ -221,9 +329,15 @@ document.addEventListener('DOMContentLoaded', () => {
             });
             console.log('Fetch response received at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), 'Status:', response.status);
 
-            const result = await response.json();
+            let result = await response.json();
             console.log('Parsed JSON from /analyze at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), result);
 
+            // The analysis runs in the background; poll for the report instead of holding the connection open
+            if (result.status === 'queued') {
+                resultsDiv.innerHTML = 'Procesando... (trabajo en cola)';
+                result = await pollJob(result.status_url);
+            }
+
             if (result.status === 'error') {
                 resultsDiv.innerHTML = `Error: ${result.message || 'Error desconocido'}`;
                 console.log('Error handled at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), result.message);
@@ -235,21 +349,7 @@ document.addEventListener('DOMContentLoaded', () => {
             console.log('Report stored at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }), window.currentReport);
 
             // Initial render with the first tab active
-            resultsDiv.innerHTML = `
-                <div class="large-box">
-                    <div class="tab-container">
-                        <div class="tab active" data-section="resumen" onclick="switchTab(event)">Resumen Ejecutivo</div>
-                        <div class="tab" data-section="analisis" onclick="switchTab(event)">Análisis de Datos</div>
-                        <div class="tab" data-section="plan" onclick="switchTab(event)">Plan Estratégico</div>
-                        <div class="tab" data-section="discurso" onclick="switchTab(event)">Discurso</div>
-                        <div class="tab" data-section="grafico" onclick="switchTab(event)">Gráfico Sugerido</div>
-                    </div>
-                    <div id="content-area" class="content-area">
-                        <h3>Análisis general de la situación política actual</h3>
-                        <p>${convertBold(window.currentReport.resumen ? window.currentReport.resumen.replace(/^\s*-\s*/gm, '').replace('Tendencias generales', '<strong>Tendencias generales</strong>') : 'No hay resumen disponible')}</p>
-                    </div>
-                </div>
-            `;
+            renderResults(resultsDiv, resumenHtml(window.currentReport));
 
             console.log('DOM updated at:', new Date().toLocaleString('es-ES', { timeZone: 'CET' }));
 
@@ -0,0 +1,314 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from per_process import SQLITE_CHUNK, PerProcess, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# La búsqueda reciente rechaza (400) un since_id de más de 7 días; se deja un margen de una hora
+CURSOR_MAX_AGE = 7 * 24 * 3600 - 3600
+# Época de los IDs de Twitter (snowflake), en milisegundos
+TWITTER_EPOCH_MS = 1288834974657
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    author_id INTEGER,
+    username TEXT,
+    created_at TEXT,
+    like_count INTEGER DEFAULT 0,
+    retweet_count INTEGER DEFAULT 0,
+    reply_count INTEGER DEFAULT 0,
+    quote_count INTEGER DEFAULT 0,
+    in_reply_to_user_id INTEGER,
+    geo TEXT,
+    attachments TEXT,
+    context_annotations TEXT,
+    sentiment TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tweet_queries (
+    tweet_id INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    concept TEXT NOT NULL,
+    politician TEXT NOT NULL,
+    PRIMARY KEY (location, politician, concept, tweet_id)
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    location TEXT NOT NULL,
+    concept TEXT NOT NULL,
+    politician TEXT NOT NULL,
+    newest_id INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (location, concept, politician)
+);
+CREATE TABLE IF NOT EXISTS cursor_gaps (
+    location TEXT NOT NULL,
+    concept TEXT NOT NULL,
+    politician TEXT NOT NULL,
+    until_id INTEGER NOT NULL,
+    newest_id INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (location, concept, politician)
+);
+CREATE TABLE IF NOT EXISTS tweet_concepts (
+    tweet_id INTEGER NOT NULL,
+    concept TEXT NOT NULL,
+    PRIMARY KEY (tweet_id, concept)
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_created_at ON tweets (created_at);
+"""
+
+# Columnas para analítica (una fila por tweet, created_at en segundos Unix); los conceptos asignados se
+# cargan aparte, un par (tweet_id, concepto) por fila
+ANALYTICS_COLUMNS = ["id", "created_at", "like_count", "retweet_count", "reply_count", "quote_count", "sentiment"]
+
+# Separador de los conceptos de un tweet en la exportación
+CONCEPT_SEPARATOR = "|"
+
+# Columnas de TweetStore.iter_export
+EXPORT_COLUMNS = [
+    "id", "created_at", "username", "text", "sentiment", "concepts",
+    "like_count", "retweet_count", "reply_count", "quote_count",
+]
+
+COLUMNS = (
+    "id, text, author_id, username, created_at, like_count, retweet_count, reply_count, quote_count, "
+    "in_reply_to_user_id, geo, attachments, context_annotations, sentiment"
+)
+
+
+def snowflake_time(tweet_id):
+    # Momento de creación (timestamp Unix) codificado en un ID de tweet
+    return ((int(tweet_id) >> 22) + TWITTER_EPOCH_MS) / 1000
+
+
+def _json(value):
+    return json.dumps(value, default=str) if value else None
+
+
+def _created_at(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class TweetStore:
+    # Almacén local de tweets con el ID más reciente visto por cada consulta (location, concept, politician),
+    # para pedir a la API solo lo nuevo (since_id) y no volver a clasificar lo ya analizado
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = PerProcess(lambda: connect_sqlite(self.db_path, SCHEMA))
+
+    def get_since_id(self, location, concept, politician=None, max_age=CURSOR_MAX_AGE):
+        # Un cursor más viejo que max_age se ignora: la API lo rechazaría y la consulta quedaría bloqueada
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT newest_id FROM cursors WHERE location = ? AND concept = ? AND politician = ?",
+                (location, concept, politician or "")
+            ).fetchone()
+        if row is None:
+            return None
+        if time.time() - snowflake_time(row[0]) > max_age:
+            logger.info(f"Ignoring stale since_id {row[0]} for {concept} ({location})")
+            return None
+        return row[0]
+
+    def get_until_id(self, location, concept, politician=None):
+        # Si la última paginación se cortó antes del final, ID del tweet más antiguo descargado: la siguiente
+        # consulta pide lo anterior a él (until_id) hasta llegar al cursor
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT until_id FROM cursor_gaps WHERE location = ? AND concept = ? AND politician = ?",
+                (location, concept, politician or "")
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, location, concept, politician, records, complete=True):
+        # Guarda los tweets y los asocia a la consulta en una sola transacción. El cursor solo avanza si la paginación
+        # llegó al final (complete); si se cortó antes, queda un hueco entre el cursor y el tweet más antiguo
+        # descargado, que se anota en cursor_gaps y se cierra (avanzando el cursor) cuando una paginación lo completa
+        if not records and not complete:
+            return
+        now = time.time()
+        key = (location, concept, politician or "")
+        rows = [
+            (
+                record["id"], record["text"], record["author_id"], record["username"], _created_at(record["created_at"]),
+                record["public_metrics"].get("like_count", 0), record["public_metrics"].get("retweet_count", 0),
+                record["public_metrics"].get("reply_count", 0), record["public_metrics"].get("quote_count", 0),
+                record["in_reply_to_user_id"], _json(record["geo"]), _json(record["attachments"]),
+                _json(record["context_annotations"]), record.get("sentiment"), now,
+            )
+            for record in records
+        ]
+        ids = [record["id"] for record in records]
+        with self._lock:
+            conn = self._connection()
+            gap = conn.execute(
+                "SELECT newest_id FROM cursor_gaps WHERE location = ? AND concept = ? AND politician = ?", key
+            ).fetchone()
+            if not records and gap is None:
+                return
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO tweets ({COLUMNS}, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET like_count = excluded.like_count, retweet_count = excluded.retweet_count, "
+                    "reply_count = excluded.reply_count, quote_count = excluded.quote_count, "
+                    "sentiment = COALESCE(tweets.sentiment, excluded.sentiment)",
+                    rows
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tweet_queries (tweet_id, location, concept, politician) VALUES (?, ?, ?, ?)",
+                    [(tweet_id, *key) for tweet_id in ids]
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tweet_concepts (tweet_id, concept) VALUES (?, ?)",
+                    [(record["id"], concept) for record in records for concept in record.get("concepts") or []]
+                )
+                if not complete:
+                    conn.execute(
+                        "INSERT INTO cursor_gaps (location, concept, politician, until_id, newest_id, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(location, concept, politician) DO UPDATE SET "
+                        "until_id = MIN(cursor_gaps.until_id, excluded.until_id), "
+                        "newest_id = MAX(cursor_gaps.newest_id, excluded.newest_id), updated_at = excluded.updated_at",
+                        (*key, min(ids), max(ids), now)
+                    )
+                    return
+                conn.execute(
+                    "INSERT INTO cursors (location, concept, politician, newest_id, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(location, concept, politician) DO UPDATE SET "
+                    "newest_id = MAX(cursors.newest_id, excluded.newest_id), updated_at = excluded.updated_at",
+                    (*key, max(ids + ([gap[0]] if gap else [])), now)
+                )
+                conn.execute("DELETE FROM cursor_gaps WHERE location = ? AND concept = ? AND politician = ?", key)
+
+    def set_sentiments(self, sentiments):
+        if not sentiments:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("UPDATE tweets SET sentiment = ? WHERE id = ?",
+                                 [(sentiment, tweet_id) for tweet_id, sentiment in sentiments.items()])
+
+    def set_concepts(self, concepts_by_id):
+        if not concepts_by_id:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tweet_concepts (tweet_id, concept) VALUES (?, ?)",
+                    [(tweet_id, concept) for tweet_id, concepts in concepts_by_id.items() for concept in concepts]
+                )
+
+    def load_columns(self, location, politician=None, since=None, limit=None, scored_only=False):
+        # Devuelve (tweets, conceptos): una tupla por tweet con ANALYTICS_COLUMNS y un par (tweet_id, concepto)
+        # por cada concepto asignado a esos tweets, sin decodificar JSON ni fechas: pensado para construir
+        # DataFrames. Un tweet sin pares aún no tiene conceptos asignados
+        selection = "FROM tweets t WHERE t.id IN (SELECT tweet_id FROM tweet_queries WHERE location = ? AND politician = ?)"
+        params = [location, politician or ""]
+        if scored_only:
+            selection += " AND t.sentiment IS NOT NULL"
+        if since is not None:
+            selection += " AND t.created_at >= ?"
+            params.append(_created_at(since))
+        selection += " ORDER BY t.id DESC"
+        if limit:
+            selection += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            conn = self._connection()
+            tweets = conn.execute(
+                "SELECT t.id, CAST(strftime('%s', t.created_at) AS INTEGER), t.like_count, t.retweet_count, "
+                f"t.reply_count, t.quote_count, t.sentiment {selection}", params
+            ).fetchall()
+            concepts = conn.execute(
+                f"SELECT c.tweet_id, c.concept FROM tweet_concepts c WHERE c.tweet_id IN (SELECT t.id {selection})", params
+            ).fetchall()
+        return tweets, concepts
+
+    def iter_export(self, location, politician=None, since=None, chunk_size=5000):
+        # Recorre los tweets de una ubicación en bloques de chunk_size filas, con una conexión propia de solo
+        # lectura para no bloquear a las demás solicitudes mientras dura la exportación
+        self._connection()  # asegura que el esquema exista
+        query = (
+            "SELECT t.id, t.created_at, t.username, t.text, t.sentiment, "
+            "(SELECT group_concat(c.concept, '|') FROM tweet_concepts c WHERE c.tweet_id = t.id), "
+            "t.like_count, t.retweet_count, t.reply_count, t.quote_count "
+            "FROM tweets t WHERE t.id IN (SELECT tweet_id FROM tweet_queries WHERE location = ? AND politician = ?)"
+        )
+        params = [location, politician or ""]
+        if since is not None:
+            query += " AND t.created_at >= ?"
+            params.append(_created_at(since))
+        query += " ORDER BY t.id DESC"
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(zip(EXPORT_COLUMNS, row))
+        finally:
+            conn.close()
+
+    def texts(self, tweet_ids):
+        with self._lock:
+            conn = self._connection()
+            found = {}
+            ids = list(tweet_ids)
+            for i in range(0, len(ids), SQLITE_CHUNK):
+                chunk = ids[i:i + SQLITE_CHUNK]
+                found.update(conn.execute(
+                    f"SELECT id, text FROM tweets WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+        return found
+
+    def load(self, location, politician=None, since=None, limit=None, concept=None):
+        # Un registro por cada par (tweet, concepto), del más reciente al más antiguo
+        query = (
+            f"SELECT q.concept, {', '.join('t.' + column.strip() for column in COLUMNS.split(','))} "
+            "FROM tweet_queries q JOIN tweets t ON t.id = q.tweet_id "
+            "WHERE q.location = ? AND q.politician = ?"
+        )
+        params = [location, politician or ""]
+        if concept is not None:
+            query += " AND q.concept = ?"
+            params.append(concept)
+        if since is not None:
+            query += " AND t.created_at >= ?"
+            params.append(_created_at(since))
+        query += " ORDER BY t.id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    @staticmethod
+    def _to_record(row):
+        (concept, tweet_id, text, author_id, username, created_at, likes, retweets, replies, quotes,
+         in_reply_to_user_id, geo, attachments, context_annotations, sentiment) = row
+        return {
+            "id": tweet_id,
+            "text": text,
+            "concept": concept,
+            "username": username,
+            "author_id": author_id,
+            "created_at": datetime.fromisoformat(created_at) if created_at else None,
+            "public_metrics": {"like_count": likes, "retweet_count": retweets, "reply_count": replies, "quote_count": quotes},
+            "in_reply_to_user_id": in_reply_to_user_id,
+            "geo": json.loads(geo) if geo else None,
+            "attachments": json.loads(attachments) if attachments else None,
+            "context_annotations": json.loads(context_annotations) if context_annotations else None,
+            "sentiment": sentiment,
+        }